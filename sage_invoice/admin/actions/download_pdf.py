@@ -1,11 +1,41 @@
+from django.conf import settings
 from django.contrib import admin
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import redirect
 from django.urls import reverse
+from django.utils.http import content_disposition_header
+
+from sage_invoice.service.archive import ArchiveService
+from sage_invoice.service.pdf import PDFService, get_pdf_filename, is_pdf_available
 
 
 @admin.action(description="Download selected invoice as PDF")
 def export_pdf(modeladmin, request, queryset):
-    invoice_ids = queryset.values_list("id", flat=True)
+    invoice_ids = list(queryset.values_list("id", flat=True))
+
+    # Large selections are streamed from the server as a single ZIP archive,
+    # straight from the action so the ids never have to fit in a URL
+    threshold = getattr(settings, "SAGE_INVOICE_ARCHIVE_THRESHOLD", 10)
+    if len(invoice_ids) > threshold:
+        file_format = "pdf" if is_pdf_available() else "html"
+        response = StreamingHttpResponse(
+            ArchiveService().stream(invoice_ids, file_format),
+            content_type="application/zip",
+        )
+        response["Content-Disposition"] = 'attachment; filename="invoices.zip"'
+        return response
+
+    # A single invoice is rendered on the server when a PDF backend is installed
+    if len(invoice_ids) == 1 and is_pdf_available():
+        invoice = queryset.get()
+        response = HttpResponse(
+            PDFService().render_pdf(invoice), content_type="application/pdf"
+        )
+        response["Content-Disposition"] = content_disposition_header(
+            True, get_pdf_filename(invoice)
+        )
+        return response
+
     invoice_ids_str = ",".join(map(str, invoice_ids))
     url = f"{reverse('download_invoices')}?invoice_ids={invoice_ids_str}"
     return redirect(url)
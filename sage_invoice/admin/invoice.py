@@ -1,10 +1,13 @@
+from decimal import Decimal, InvalidOperation
+
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
 from django.utils.translation import gettext_lazy as _
 from import_export.admin import ImportExportModelAdmin
 
 from sage_invoice.admin.actions import export_pdf
-from sage_invoice.models import Column, Expense, Invoice, Item, CustomerProfile
-from sage_invoice.resource import InvoiceResource
+from sage_invoice.models import Column, CustomerProfile, Expense, Invoice, Item
+from sage_invoice.resource import BulkInvoiceResource, InvoiceResource
 
 
 class ItemInline(admin.TabularInline):
@@ -35,14 +38,39 @@ class CustomerProfileInline(admin.StackedInline):
     model = CustomerProfile
 
 
+class GrandTotalFilter(admin.SimpleListFilter):
+    title = _("grand total")
+    parameter_name = "grand_total"
+    # Lower bounds of each range, read from the indexed ``grand_total`` column
+    bounds = (Decimal(0), Decimal(100), Decimal(1000), Decimal(10000))
+
+    def lookups(self, request, model_admin):
+        ranges = zip(self.bounds, self.bounds[1:])
+        lookups = [(f"{low}-{high}", f"{low} – {high}") for low, high in ranges]
+        lookups.append((f"{self.bounds[-1]}-", f"{self.bounds[-1]}+"))
+        return lookups
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        low, _separator, high = self.value().partition("-")
+        try:
+            queryset = queryset.filter(grand_total__gte=Decimal(low))
+            if high:
+                queryset = queryset.filter(grand_total__lt=Decimal(high))
+        except InvalidOperation as error:
+            raise IncorrectLookupParameters(error) from error
+        return queryset
+
+
 @admin.register(Invoice)
 class InvoiceAdmin(ImportExportModelAdmin, admin.ModelAdmin):
-    resource_class = InvoiceResource
+    resource_classes = [InvoiceResource, BulkInvoiceResource]
     admin_priority = 1
-    list_display = ("title", "invoice_date", "status")
+    list_display = ("title", "invoice_date", "status", "grand_total", "item_count")
     search_fields = ("status", "customer_email")
     save_on_top = True
-    list_filter = ("status", "invoice_date", "category")
+    list_filter = ("status", "invoice_date", "category", GrandTotalFilter)
     ordering = ("-invoice_date",)
     autocomplete_fields = ("category",)
     readonly_fields = ("slug",)
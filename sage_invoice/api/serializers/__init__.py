@@ -2,4 +2,4 @@ from .category import CategorySerializer
 from .column import ColumnSerializer
 from .expense import ExpenseSerializer
 from .invoice import InvoiceSerializer
-from .item import ItemSerializer
+from .item import BulkItemSerializer, ItemSerializer
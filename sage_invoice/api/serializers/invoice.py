@@ -1,11 +1,11 @@
 from rest_framework import serializers
 
+from sage_invoice.models import Invoice
+
 from .category import CategorySerializer
 from .column import ColumnSerializer
-from .item import ItemSerializer
 from .expense import ExpenseSerializer
-
-from sage_invoice.models import Invoice
+from .item import ItemSerializer
 
 
 class ContactFieldSerializer(serializers.Serializer):
@@ -68,6 +68,8 @@ class InvoiceSerializer(serializers.HyperlinkedModelSerializer):
             "items",
             "columns",
             "expense",
+            "grand_total",
+            "item_count",
         ]
         extra_kwargs = {
             "url": {"lookup_field": "slug"},
@@ -1,7 +1,7 @@
 # serializers.py
 from rest_framework import serializers
 
-from sage_invoice.models import Item
+from sage_invoice.models import Invoice, Item
 
 
 class ItemSerializer(serializers.HyperlinkedModelSerializer):
@@ -13,3 +13,18 @@ class ItemSerializer(serializers.HyperlinkedModelSerializer):
             "url": {"lookup_field": "id"},
             "invoice": {"lookup_field": "slug"},
         }
+
+
+class ItemRowSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Item
+        fields = ["description", "quantity", "measurement", "unit_price"]
+
+
+class BulkItemSerializer(serializers.Serializer):
+    """Validate the items of one invoice added in a single request."""
+
+    invoice = serializers.SlugRelatedField(
+        slug_field="slug", queryset=Invoice.objects.all()
+    )
+    items = ItemRowSerializer(many=True, allow_empty=False)
@@ -1,6 +1,9 @@
+from django.http import HttpResponse
+from django.utils.http import content_disposition_header
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException
 from rest_framework.filters import OrderingFilter, SearchFilter
 from rest_framework.response import Response
 
@@ -13,12 +16,21 @@ from sage_invoice.api.serializers import (
     ItemSerializer,
 )
 from sage_invoice.models import Column, Expense, Invoice, Item
+from sage_invoice.service.pdf import PDFService, get_pdf_filename, is_pdf_available
+
+
+class PDFUnavailable(APIException):
+    status_code = status.HTTP_501_NOT_IMPLEMENTED
+    default_detail = "Server-side PDF rendering is not available."
+    default_code = "pdf_unavailable"
 
 
 class InvoiceViewSet(ErrorHandlingMixin, viewsets.ModelViewSet):
-    queryset = Invoice.objects.select_related("category", "expense", "customer").prefetch_related("category__invoices",
-        "items__invoice", "columns__item"
-    ).all()
+    queryset = (
+        Invoice.objects.select_related("category", "expense", "customer")
+        .prefetch_related("category__invoices", "items__invoice", "columns__item")
+        .all()
+    )
     serializer_class = InvoiceSerializer
     lookup_field = "slug"
     versioning_class = HeaderVersioning
@@ -28,6 +40,27 @@ class InvoiceViewSet(ErrorHandlingMixin, viewsets.ModelViewSet):
         "tracking_code",
         "customer_name",
     )
-    filterset_fields = ("receipt", "status", "category")
-    ordering_fields = ("invoice_date", "due_date")
+    filterset_fields = {
+        "receipt": ["exact"],
+        "status": ["exact"],
+        "category": ["exact"],
+        "grand_total": ["exact", "gte", "lte"],
+        "item_count": ["exact", "gte", "lte"],
+    }
+    ordering_fields = ("invoice_date", "due_date", "grand_total", "item_count")
     ordering = "-invoice_date"
+
+    @action(detail=True, methods=["get"])
+    def pdf(self, request, slug=None):
+        """Return the invoice rendered to PDF on the server."""
+        if not is_pdf_available():
+            raise PDFUnavailable()
+
+        invoice = self.get_object()
+        response = HttpResponse(
+            PDFService().render_pdf(invoice), content_type="application/pdf"
+        )
+        response["Content-Disposition"] = content_disposition_header(
+            True, get_pdf_filename(invoice)
+        )
+        return response
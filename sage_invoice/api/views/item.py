@@ -1,8 +1,11 @@
 # views.py
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 
-from sage_invoice.api.serializers import ItemSerializer
+from sage_invoice.api.serializers import BulkItemSerializer, ItemSerializer
 from sage_invoice.models import Item
+from sage_invoice.service.items import ItemService
 
 
 class ItemViewSet(viewsets.ModelViewSet):
@@ -10,3 +13,19 @@ class ItemViewSet(viewsets.ModelViewSet):
     serializer_class = ItemSerializer
     lookup_field = "id"
     lookup_url_kwarg = "id"
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """Add many items to one invoice with a single INSERT per batch."""
+        serializer = BulkItemSerializer(
+            data=request.data, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        invoice = serializer.validated_data["invoice"]
+        items = ItemService().bulk_add_items(
+            invoice, serializer.validated_data["items"]
+        )
+        return Response(
+            {"invoice": invoice.slug, "count": len(items)},
+            status=status.HTTP_201_CREATED,
+        )
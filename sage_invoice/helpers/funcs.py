@@ -4,20 +4,18 @@ from datetime import datetime
 
 from django.conf import settings
 
-from sage_invoice.service.discovery import JinjaTemplateDiscovery
+from sage_invoice.service.discovery import template_registry
 
 
 def get_template_choices(is_receipt=False):
     """
     Returns a combined list of default and custom templates, formatted for use in a
     model's choices field, filtered by the `is_receipt` flag.
-    """
-    discovery = JinjaTemplateDiscovery()
-    default_templates = discovery.get_default_templates(is_receipt=is_receipt)
-    custom_templates = discovery.get_custom_templates(is_receipt=is_receipt)
 
-    choices = [(template, template) for template in default_templates]
-    choices += [(template, template) for template in custom_templates]
+    Results come from the process-level template registry, which only rescans a
+    template directory when its mtime changes.
+    """
+    choices = template_registry.get_choices(is_receipt=is_receipt)
 
     if not choices:
         return [("", "No templates available")]
@@ -25,6 +23,18 @@ def get_template_choices(is_receipt=False):
     return choices
 
 
+class LazyTemplateChoices:
+    """
+    Iterable of the invoice template choices, resolved on every iteration.
+
+    Django 4.2 has no callable field choices; handing it this object instead of
+    a list keeps importing the models free of template directory scans.
+    """
+
+    def __iter__(self):
+        return iter(get_template_choices())
+
+
 def generate_tracking_code(user_input: str, creation_date: datetime) -> str:
     """Generate a unique tracking code based on user input and the creation
     date.
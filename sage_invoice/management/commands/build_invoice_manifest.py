@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sage_invoice.service.discovery import (
+    JinjaTemplateDiscovery,
+    get_manifest_path,
+    write_manifest,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the manifest of invoice templates so processes can list the "
+        "template choices without scanning every installed app."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            help=(
+                "File to write the manifest to. Defaults to "
+                "SAGE_INVOICE_TEMPLATE_MANIFEST."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"] or get_manifest_path()
+        if not output:
+            raise CommandError(
+                "Pass --output or define SAGE_INVOICE_TEMPLATE_MANIFEST."
+            )
+
+        manifest = JinjaTemplateDiscovery().build_manifest()
+        try:
+            written = write_manifest(output, manifest)
+        except OSError as err:
+            raise CommandError(f"Failed to write {output}: {err}") from err
+
+        count = len(manifest["templates"])
+        if written:
+            message = f"Wrote {count} templates to {output}"
+        else:
+            message = f"{output} is up to date ({count} templates)"
+        self.stdout.write(self.style.SUCCESS(message))
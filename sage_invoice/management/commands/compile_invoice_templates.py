@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from jinja2 import TemplateSyntaxError
+
+from sage_invoice.service.environment import (
+    create_environment,
+    get_compiled_templates_dir,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile every discovered invoice template into Python modules so "
+        "workers can load them without parsing the sources."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            help=(
+                "Directory to write the compiled modules to. Defaults to "
+                "SAGE_INVOICE_COMPILED_TEMPLATES_DIR."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        target = options["target"] or get_compiled_templates_dir()
+        if not target:
+            raise CommandError(
+                "Pass --target or define SAGE_INVOICE_COMPILED_TEMPLATES_DIR."
+            )
+
+        environment = create_environment()
+        compiled = []
+
+        def log(message):
+            if message.startswith("Compiled"):
+                compiled.append(message)
+            if options["verbosity"] > 1:
+                self.stdout.write(message)
+
+        try:
+            environment.compile_templates(
+                target,
+                extensions=["jinja2"],
+                zip=None,
+                log_function=log,
+                ignore_errors=False,
+            )
+        except TemplateSyntaxError as err:
+            raise CommandError(
+                f"Failed to compile {err.filename or err.name}: {err}"
+            ) from err
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Compiled {len(compiled)} templates into {target}")
+        )
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sage_invoice.helpers.choice import InvoiceStatus
+from sage_invoice.models import Invoice
+from sage_invoice.service.export import ExportService
+
+
+class Command(BaseCommand):
+    help = (
+        "Export invoices to a CSV or JSON Lines file, streaming them in chunks "
+        "so memory use stays flat however many invoices are exported."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="The file to write.")
+        parser.add_argument(
+            "--format",
+            choices=ExportService.formats,
+            default="csv",
+            help="The file format. Defaults to csv.",
+        )
+        parser.add_argument(
+            "--gzip",
+            action="store_true",
+            help="Compress the file with gzip.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help=(
+                "Number of invoices read per query. Defaults to the "
+                "SAGE_INVOICE_EXPORT_CHUNK_SIZE setting."
+            ),
+        )
+        parser.add_argument(
+            "--category",
+            action="append",
+            default=[],
+            help="Only invoices of the category with this slug. Repeatable.",
+        )
+        parser.add_argument(
+            "--status",
+            action="append",
+            default=[],
+            choices=InvoiceStatus.values,
+            help="Only invoices with this status. Repeatable.",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] is not None and options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+
+        queryset = Invoice.objects.all()
+        if options["category"]:
+            queryset = queryset.filter(category__slug__in=options["category"])
+        if options["status"]:
+            queryset = queryset.filter(status__in=options["status"])
+
+        service = ExportService(
+            options["format"], options["gzip"], options["chunk_size"]
+        )
+        try:
+            with open(options["path"], "wb") as file:
+                count = service.write(file, queryset)
+        except OSError as error:
+            raise CommandError(f"Cannot write {options['path']}: {error}") from error
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Exported {count} invoices to {options['path']}.")
+        )
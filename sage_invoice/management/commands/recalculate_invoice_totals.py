@@ -0,0 +1,202 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from decimal import Decimal
+from multiprocessing import get_context
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Max, Min
+
+from sage_invoice.helpers.choice import InvoiceStatus
+from sage_invoice.models import Expense, Invoice
+from sage_invoice.service.total import ExpenseService
+
+CENT = Decimal("0.01")
+
+Diff = Tuple[Any, str, Optional[Decimal], Decimal]
+
+
+def iter_id_chunks(
+    filters: Dict[str, Any], start: Any, end: Any, chunk_size: int
+) -> Iterator[List[Any]]:
+    """Yield the ids of the matching invoices in ``[start, end]`` in chunks,
+    paging on the primary key rather than with offsets.
+    """
+    queryset = (
+        Invoice.objects.filter(**filters, pk__gte=start, pk__lte=end)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    last_id = None
+    while True:
+        page = queryset if last_id is None else queryset.filter(pk__gt=last_id)
+        ids = list(page[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def split_range(start: int, end: int, parts: int) -> List[Tuple[int, int]]:
+    """Split the inclusive id range ``[start, end]`` into ``parts`` ranges."""
+    size = max((end - start + 1 + parts - 1) // parts, 1)
+    return [(low, min(low + size - 1, end)) for low in range(start, end + 1, size)]
+
+
+def get_diffs(
+    stored: Dict[Any, Tuple[Decimal, ...]], expenses: List[Expense]
+) -> List[Diff]:
+    diffs = []
+    for expense in expenses:
+        before = stored.get(expense.invoice_id)
+        for position, field in enumerate(ExpenseService.amount_fields):
+            after = Decimal(getattr(expense, field)).quantize(CENT)
+            old = before[position] if before else None
+            if old is None or old.quantize(CENT) != after:
+                diffs.append((expense.invoice_id, field, old, after))
+    return diffs
+
+
+def recalculate_range(
+    filters: Dict[str, Any],
+    start: Any,
+    end: Any,
+    chunk_size: int,
+    dry_run: bool,
+) -> Tuple[int, List[Diff]]:
+    """Recalculate the invoices of one id range, chunk by chunk.
+
+    Runs in the worker processes, so it only takes picklable arguments.
+
+    Returns:
+        Tuple[int, List[Diff]]: The number of invoices processed and, on a dry
+        run, the amounts that would change.
+    """
+    service = ExpenseService()
+    count = 0
+    diffs: List[Diff] = []
+    for ids in iter_id_chunks(filters, start, end, chunk_size):
+        count += len(ids)
+        if dry_run:
+            stored = {
+                row[0]: row[1:]
+                for row in Expense.objects.filter(invoice_id__in=ids).values_list(
+                    "invoice_id", *ExpenseService.amount_fields
+                )
+            }
+            diffs += get_diffs(stored, service.calculate(ids, create_missing=True))
+        else:
+            with transaction.atomic():
+                service.recalculate(ids, create_missing=True)
+    return count, diffs
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalculate the Expense totals of invoices in bulk: one aggregate "
+        "query and one bulk update per chunk of invoices."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--category",
+            action="append",
+            default=[],
+            help="Only invoices of the category with this slug. Repeatable.",
+        )
+        parser.add_argument(
+            "--status",
+            action="append",
+            default=[],
+            choices=InvoiceStatus.values,
+            help="Only invoices with this status. Repeatable.",
+        )
+        parser.add_argument(
+            "--from-date",
+            type=date.fromisoformat,
+            help="Only invoices dated on or after this day (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--to-date",
+            type=date.fromisoformat,
+            help="Only invoices dated on or before this day (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of invoices recalculated per query. Defaults to 500.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help=(
+                "Split the invoice id range across this many processes. "
+                "Ignored on SQLite, which allows a single writer."
+            ),
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the amounts that would change without saving them.",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1 or options["workers"] < 1:
+            raise CommandError("--chunk-size and --workers must be positive.")
+
+        workers = options["workers"]
+        if workers > 1 and connection.vendor == "sqlite":
+            self.stderr.write("SQLite allows a single writer; using one worker.")
+            workers = 1
+
+        filters = self.get_filters(options)
+        bounds = Invoice.objects.filter(**filters).aggregate(
+            start=Min("pk"), end=Max("pk")
+        )
+        if bounds["start"] is None:
+            self.stdout.write("No invoices match the given filters.")
+            return
+
+        jobs = [
+            (filters, start, end, options["chunk_size"], options["dry_run"])
+            for start, end in split_range(bounds["start"], bounds["end"], workers)
+        ]
+        if len(jobs) == 1:
+            results = [recalculate_range(*jobs[0])]
+        else:
+            # Workers open their own connections; never share the parent's
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=len(jobs),
+                mp_context=get_context("spawn"),
+                initializer=django.setup,
+            ) as executor:
+                results = list(executor.map(recalculate_range, *zip(*jobs)))
+
+        count = sum(processed for processed, _ in results)
+        diffs = [diff for _, range_diffs in results for diff in range_diffs]
+        if options["dry_run"]:
+            for invoice_id, field, old, new in diffs:
+                self.stdout.write(f"Invoice {invoice_id}: {field} {old} -> {new}")
+            changed = len({invoice_id for invoice_id, *_ in diffs})
+            self.stdout.write(f"Dry run: {changed} of {count} invoices would change.")
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"Recalculated totals of {count} invoices.")
+            )
+
+    def get_filters(self, options) -> Dict[str, Any]:
+        filters: Dict[str, Any] = {}
+        if options["category"]:
+            filters["category__slug__in"] = options["category"]
+        if options["status"]:
+            filters["status__in"] = options["status"]
+        if options["from_date"]:
+            filters["invoice_date__gte"] = options["from_date"]
+        if options["to_date"]:
+            filters["invoice_date__lte"] = options["to_date"]
+        return filters
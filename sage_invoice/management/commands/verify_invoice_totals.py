@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+
+from sage_invoice.models import Expense, Invoice
+from sage_invoice.service.total import ExpenseService
+
+from .recalculate_invoice_totals import get_diffs, iter_id_chunks
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the stored Expense totals of every invoice against a full "
+        "recalculation and report the invoices that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of invoices verified per query. Defaults to 500.",
+        )
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Recalculate the totals of the invoices that drifted.",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+
+        bounds = Invoice.objects.aggregate(start=Min("pk"), end=Max("pk"))
+        if bounds["start"] is None:
+            self.stdout.write("No invoices to verify.")
+            return
+
+        service = ExpenseService()
+        count = 0
+        drifted = set()
+        for ids in iter_id_chunks(
+            {}, bounds["start"], bounds["end"], options["chunk_size"]
+        ):
+            count += len(ids)
+            stored = {
+                row[0]: row[1:]
+                for row in Expense.objects.filter(invoice_id__in=ids).values_list(
+                    "invoice_id", *ExpenseService.amount_fields
+                )
+            }
+            diffs = get_diffs(stored, service.calculate(ids, create_missing=True))
+            for invoice_id, field, old, new in diffs:
+                self.stdout.write(f"Invoice {invoice_id}: {field} {old} != {new}")
+            chunk_drifted = {invoice_id for invoice_id, *_ in diffs}
+            if chunk_drifted and options["fix"]:
+                with transaction.atomic():
+                    service.recalculate(chunk_drifted, create_missing=True)
+            drifted |= chunk_drifted
+
+        if not drifted:
+            self.stdout.write(
+                self.style.SUCCESS(f"Totals of all {count} invoices are consistent.")
+            )
+        elif options["fix"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Recalculated totals of {len(drifted)} of {count} invoices."
+                )
+            )
+        else:
+            raise CommandError(
+                f"Totals of {len(drifted)} of {count} invoices drifted; "
+                "run with --fix to recalculate them."
+            )
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:49
+
+import sage_invoice.helpers.funcs
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sage_invoice', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='invoice',
+            name='template_choice',
+            field=models.CharField(choices=sage_invoice.helpers.funcs.get_template_choices, db_comment='Template choice for the invoice', help_text='The template you want for your invoice', max_length=20, verbose_name='Template choice'),
+        ),
+    ]
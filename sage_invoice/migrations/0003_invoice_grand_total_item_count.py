@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:08
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def sync_invoice_totals(apps, schema_editor):
+    Expense = apps.get_model("sage_invoice", "Expense")
+    Invoice = apps.get_model("sage_invoice", "Invoice")
+    Item = apps.get_model("sage_invoice", "Item")
+    item_counts = (
+        Item.objects.filter(invoice=OuterRef("pk"))
+        .order_by()
+        .values("invoice")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    grand_total = Expense.objects.filter(invoice=OuterRef("pk")).values(
+        "total_amount"
+    )[:1]
+    Invoice.objects.using(schema_editor.connection.alias).update(
+        grand_total=Coalesce(Subquery(grand_total), Value(Decimal(0))),
+        item_count=Coalesce(Subquery(item_counts), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sage_invoice", "0002_alter_invoice_template_choice"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="invoice",
+            name="grand_total",
+            field=models.DecimalField(
+                db_comment="Denormalized total amount of the invoice expense",
+                db_index=True,
+                decimal_places=2,
+                default=Decimal("0.00"),
+                editable=False,
+                help_text="The total amount of the invoice, copied from its expense.",
+                max_digits=10,
+                verbose_name="Grand Total",
+            ),
+        ),
+        migrations.AddField(
+            model_name="invoice",
+            name="item_count",
+            field=models.PositiveIntegerField(
+                db_comment="Denormalized number of items in the invoice",
+                default=0,
+                editable=False,
+                help_text="The number of items in the invoice.",
+                verbose_name="Item Count",
+            ),
+        ),
+        migrations.RunPython(sync_invoice_totals, migrations.RunPython.noop),
+    ]
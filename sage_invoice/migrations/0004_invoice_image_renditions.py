@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sage_invoice", "0003_invoice_grand_total_item_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="invoice",
+            name="image_renditions",
+            field=models.JSONField(
+                blank=True,
+                db_comment="Rendition file names of the invoice images, keyed by field",
+                default=dict,
+                editable=False,
+                help_text="The compressed copies of the logo, signature and stamp.",
+                verbose_name="Image Renditions",
+            ),
+        ),
+    ]
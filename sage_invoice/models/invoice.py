@@ -1,3 +1,6 @@
+from decimal import Decimal
+
+import django
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.urls import reverse
@@ -6,7 +9,26 @@ from django_jsonform.models.fields import JSONField
 from sage_tools.mixins.models import TitleSlugMixin
 
 from sage_invoice.helpers.choice import Currency, InvoiceStatus
-from sage_invoice.helpers.funcs import generate_tracking_code, get_template_choices
+from sage_invoice.helpers.funcs import (
+    LazyTemplateChoices,
+    generate_tracking_code,
+    get_template_choices,
+)
+
+
+class TemplateChoiceField(models.CharField):
+    """A ``CharField`` for lazily resolved template choices.
+
+    Django 4.2 turns ``LazyTemplateChoices`` into a list when deconstructing the
+    field, so migrations would freeze the templates installed at the time.
+    They record ``get_template_choices`` instead, on every Django version.
+    """
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if isinstance(self.choices, LazyTemplateChoices):
+            kwargs["choices"] = get_template_choices
+        return name, "django.db.models.CharField", args, kwargs
 
 
 class Invoice(TitleSlugMixin):
@@ -23,7 +45,7 @@ class Invoice(TitleSlugMixin):
         ),
         db_comment="Tracking code created",
     )
-    
+
     status = models.CharField(
         max_length=50,
         choices=InvoiceStatus.choices,
@@ -112,13 +134,41 @@ class Invoice(TitleSlugMixin):
         help_text=_("The stamp image for the invoice."),
         db_comment="Stamp image for the invoice",
     )
-    template_choice = models.CharField(
+    image_renditions = models.JSONField(
+        verbose_name=_("Image Renditions"),
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text=_("The compressed copies of the logo, signature and stamp."),
+        db_comment="Rendition file names of the invoice images, keyed by field",
+    )
+    template_choice = TemplateChoiceField(
         verbose_name=_("Template choice"),
         max_length=20,
-        choices=get_template_choices(),
+        # Resolved lazily so importing the models never scans template folders
+        choices=(
+            get_template_choices if django.VERSION >= (5, 0) else LazyTemplateChoices()
+        ),
         help_text=_("The template you want for your invoice"),
         db_comment="Template choice for the invoice",
     )
+    grand_total = models.DecimalField(
+        verbose_name=_("Grand Total"),
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal("0.00"),
+        editable=False,
+        db_index=True,
+        help_text=_("The total amount of the invoice, copied from its expense."),
+        db_comment="Denormalized total amount of the invoice expense",
+    )
+    item_count = models.PositiveIntegerField(
+        verbose_name=_("Item Count"),
+        default=0,
+        editable=False,
+        help_text=_("The number of items in the invoice."),
+        db_comment="Denormalized number of items in the invoice",
+    )
 
     def clean(self):
         # Ensure both `due_date` and `invoice_date` are set before comparing them
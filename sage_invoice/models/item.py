@@ -1,6 +1,91 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.lookups import Exact, IsNull
 from django.utils.translation import gettext_lazy as _
 
+_UNCHANGED = object()
+
+
+def get_total_price(quantity=_UNCHANGED, unit_price=_UNCHANGED) -> Case:
+    """The SQL of ``Item.calculate_total_price``: an item without a quantity
+    costs its unit price.
+
+    Either amount defaults to the item's current column and may be an
+    expression or a raw value.
+    """
+    if quantity is _UNCHANGED:
+        quantity = F("quantity")
+    if unit_price is _UNCHANGED:
+        unit_price = F("unit_price")
+    amount_field = models.DecimalField(max_digits=10, decimal_places=2)
+    if not hasattr(quantity, "resolve_expression"):
+        quantity = Value(quantity, output_field=models.PositiveIntegerField())
+    if not hasattr(unit_price, "resolve_expression"):
+        unit_price = Value(unit_price, output_field=amount_field)
+    return Case(
+        When(Q(IsNull(quantity, True)) | Q(Exact(quantity, 0)), then=unit_price),
+        default=quantity * unit_price,
+        output_field=amount_field,
+    )
+
+
+class ItemQuerySet(models.QuerySet):
+    """Bulk operations skip ``save`` and its signals, so the invoices they touch
+    are recalculated in one batch when the transaction commits.
+    """
+
+    def update(self, **kwargs):
+        amount_fields = {"quantity", "unit_price", "invoice", "invoice_id"}
+        if not amount_fields.intersection(kwargs):
+            return super().update(**kwargs)
+
+        invoice_ids = set(self.values_list("invoice_id", flat=True))
+        # The SET clause sees the old values, so substitute the new ones
+        kwargs.setdefault(
+            "total_price",
+            get_total_price(
+                kwargs.get("quantity", _UNCHANGED),
+                kwargs.get("unit_price", _UNCHANGED),
+            ),
+        )
+        updated = super().update(**kwargs)
+        new_invoice = kwargs.get("invoice_id", kwargs.get("invoice"))
+        if new_invoice is not None:
+            invoice_ids.add(getattr(new_invoice, "pk", new_invoice))
+        self._schedule_recalculation(invoice_ids)
+        return updated
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for item in objs:
+            item.total_price = item.calculate_total_price()
+        created = super().bulk_create(objs, *args, **kwargs)
+        self._schedule_recalculation({item.invoice_id for item in objs})
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if "quantity" in fields or "unit_price" in fields:
+            for item in objs:
+                item.total_price = item.calculate_total_price()
+            fields = list({*fields, "total_price"})
+        updated = super().bulk_update(objs, fields, *args, **kwargs)
+        self._schedule_recalculation({item.invoice_id for item in objs})
+        return updated
+
+    def delete(self):
+        # Queue the batch before the rows go, so the post_delete signal of each
+        # item leaves its invoice to it instead of applying a delta per item
+        with transaction.atomic(using=self.db):
+            self._schedule_recalculation(set(self.values_list("invoice_id", flat=True)))
+            return super().delete()
+
+    def _schedule_recalculation(self, invoice_ids):
+        from sage_invoice.service.total import schedule_recalculation
+
+        for invoice_id in invoice_ids:
+            schedule_recalculation(invoice_id, using=self.db)
+
 
 class Item(models.Model):
     description = models.CharField(
@@ -49,12 +134,27 @@ class Item(models.Model):
         db_comment="The associated invoice for this item",
     )
 
+    objects = ItemQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored total so a save can update the invoice totals by
+        # the difference instead of summing every item again
+        loaded = dict(zip(field_names, values))
+        if "invoice_id" in loaded and "total_price" in loaded:
+            instance._loaded_values = (loaded["invoice_id"], loaded["total_price"])
+        return instance
+
     def save(self, *args, **kwargs):
-        if self.quantity:
-            self.total_price = self.quantity * self.unit_price
-        else:
-            self.total_price = self.unit_price
+        self.total_price = self.calculate_total_price()
         super().save(*args, **kwargs)
+        self._loaded_values = (self.invoice_id, self.total_price)
+
+    def calculate_total_price(self):
+        if self.quantity:
+            return self.quantity * self.unit_price
+        return self.unit_price
 
     def __str__(self):
         return f"{self.description} - {self.quantity} x {self.unit_price}"
@@ -1,11 +1,15 @@
 import json
+from collections import defaultdict
 from decimal import Decimal
 
 from django.core.exceptions import ValidationError
+from django.db import connections, router
 from import_export import fields, resources
+from import_export.results import RowResult
 from import_export.widgets import BooleanWidget, DateWidget, ForeignKeyWidget, Widget
 
 from sage_invoice.models import Category, Column, Expense, Invoice, Item
+from sage_invoice.service.total import ExpenseService
 
 
 class JSONFieldWidget(Widget):
@@ -158,11 +162,19 @@ class InvoiceResource(resources.ModelResource):
         )
         import_id_fields = ["id"]
 
+    # Write items, columns and totals per batch of rows rather than per record
+    bulk_import = False
+    # Rows per batch of related records; categories are batched in both modes
+    bulk_batch_size = 1000
+
     def before_import_row(self, row, **kwargs):
         """
         Before importing, handle category, items, columns, and totals exactly like
         other fields.
         """
+        if self.bulk_import:
+            return
+
         # Initialize the invoice_item_map for each row import
         self.invoice_item_map = {}
 
@@ -175,24 +187,6 @@ class InvoiceResource(resources.ModelResource):
         if row.get("totals"):
             self.create_expenses(row["totals"], row["id"])
 
-    def after_import_row(self, row, row_result, **kwargs):
-        """After row import, assign the created or updated category to the invoice."""
-        if row.get("category"):
-            category_data = row["category"].split("|")
-            title = category_data[0].strip()
-            description = category_data[1].strip() if len(category_data) > 1 else ""
-
-            # Create or update the Category
-            category, created = Category.objects.update_or_create(
-                title=title,
-                defaults={"description": description},
-            )
-
-            # Now, directly set the category for the current invoice
-            invoice = Invoice.objects.get(id=row["id"])
-            invoice.category = category
-            invoice.save()
-
     def create_invoice_items(self, items_data, invoice_id):
         items = items_data.split("; ")
         for item_data in items:
@@ -256,33 +250,291 @@ class InvoiceResource(resources.ModelResource):
         except ValueError as err:
             raise ValidationError(f"Invalid totals data: {totals_data}") from err
 
+    def before_import(self, dataset, **kwargs):
+        super().before_import(dataset, **kwargs)
+        # Category title -> (id, description), shared by every batch of the import
+        self.categories = {}
+        # (invoice id, row) of every row whose invoice was saved
+        self.imported_rows = []
+
+    def after_import_row(self, row, row_result, **kwargs):
+        """Remember the invoice each row saved, new invoices included."""
+        super().after_import_row(row, row_result, **kwargs)
+        if row_result.import_type in (
+            RowResult.IMPORT_TYPE_NEW,
+            RowResult.IMPORT_TYPE_UPDATE,
+        ):
+            self.imported_rows.append((row_result.object_id, row))
+
+    def after_import(self, dataset, result, **kwargs):
+        """Once the invoices are saved, assign their categories and, in bulk
+        mode, import their items, columns and totals, batch by batch.
+        """
+        super().after_import(dataset, result, **kwargs)
+        rows = self.imported_rows
+        for start in range(0, len(rows), self.bulk_batch_size):
+            batch = rows[start : start + self.bulk_batch_size]
+            if self.bulk_import:
+                self.bulk_import_relations(batch)
+            self.import_categories(batch)
+
+    def import_categories(self, rows):
+        """Create or update the categories of a batch of rows, matched on their
+        title, and assign them with one UPDATE per category.
+
+        Titles already seen during the import are not looked up again; only
+        their description is updated when it changes.
+        """
+        descriptions = {}
+        invoice_ids = defaultdict(list)
+        for invoice_id, row in rows:
+            if row.get("category"):
+                category_data = row["category"].split("|")
+                title = category_data[0].strip()
+                # The last row mentioning a category sets its description
+                descriptions[title] = (
+                    category_data[1].strip() if len(category_data) > 1 else ""
+                )
+                invoice_ids[title].append(invoice_id)
+        if not descriptions:
+            return
+
+        missing = [title for title in descriptions if title not in self.categories]
+        for pk, title, description in Category.objects.filter(
+            title__in=missing
+        ).values_list("pk", "title", "description"):
+            self.categories.setdefault(title, (pk, description))
+
+        changed = []
+        for title, description in descriptions.items():
+            if title not in self.categories:
+                # New categories are saved one by one so they get unique slugs
+                category = Category.objects.create(title=title, description=description)
+                self.categories[title] = (category.pk, description)
+            elif self.categories[title][1] != description:
+                pk = self.categories[title][0]
+                changed.append(Category(pk=pk, description=description))
+                self.categories[title] = (pk, description)
+        Category.objects.bulk_update(changed, ["description"])
+
+        # A plain UPDATE: saving each invoice again would recalculate its totals
+        for title, ids in invoice_ids.items():
+            Invoice.objects.filter(pk__in=ids).update(
+                category_id=self.categories[title][0]
+            )
+
+    def bulk_import_relations(self, rows):
+        """Import the items, columns and totals of a batch of rows.
+
+        Existing records are read with one query per model and written with
+        ``bulk_update``/``bulk_create``, instead of an ``update_or_create`` per
+        record.
+        """
+        if not rows:
+            return
+
+        last_items = self.bulk_import_items(
+            [(invoice_id, row["items"]) for invoice_id, row in rows if row.get("items")]
+        )
+        self.bulk_import_columns(
+            [
+                (invoice_id, row["columns"])
+                for invoice_id, row in rows
+                if row.get("columns")
+            ],
+            last_items,
+        )
+        self.bulk_import_expenses(
+            [
+                (invoice_id, row["totals"])
+                for invoice_id, row in rows
+                if row.get("totals")
+            ]
+        )
+
+    def bulk_import_items(self, items_data):
+        """Create or update the items of many invoices, matched on their
+        description like ``create_invoice_items``.
+
+        Returns:
+            dict: The last item of each invoice, which its columns belong to.
+        """
+        existing = {
+            (invoice_id, description): pk
+            for pk, invoice_id, description in Item.objects.filter(
+                invoice_id__in=[invoice_id for invoice_id, _ in items_data]
+            ).values_list("pk", "invoice_id", "description")
+        }
+        items = {}
+        last_items = {}
+        for invoice_id, data in items_data:
+            for item_data in data.split("; "):
+                try:
+                    description, quantity, unit_price, _total = item_data.split("|")
+                    key = (invoice_id, description.strip())
+                    item = items.setdefault(
+                        key,
+                        Item(
+                            pk=existing.get(key),
+                            invoice_id=invoice_id,
+                            description=key[1],
+                        ),
+                    )
+                    item.quantity = int(quantity.strip())
+                    item.unit_price = Decimal(unit_price.strip())
+                except (ValueError, ArithmeticError) as err:
+                    raise ValidationError(f"Invalid item data:{item_data}") from err
+                last_items[invoice_id] = item
+
+        Item.objects.bulk_update(
+            [item for item in items.values() if item.pk],
+            ["quantity", "unit_price"],
+            batch_size=self.bulk_batch_size,
+        )
+        created = [item for item in items.values() if item.pk is None]
+        Item.objects.bulk_create(created, batch_size=self.bulk_batch_size)
+        if any(item.pk is None for item in created):
+            # Backends that cannot return primary keys from bulk inserts
+            pks = {
+                (invoice_id, description): pk
+                for pk, invoice_id, description in Item.objects.filter(
+                    invoice_id__in={item.invoice_id for item in created}
+                ).values_list("pk", "invoice_id", "description")
+            }
+            for item in created:
+                item.pk = pks[(item.invoice_id, item.description)]
+        return last_items
+
+    def bulk_import_columns(self, columns_data, last_items):
+        """Create or update the columns of many invoices, attached to the last
+        item of each invoice like ``create_invoice_columns``.
+        """
+        existing = {
+            (invoice_id, item_id, column_name): pk
+            for pk, invoice_id, item_id, column_name in Column.objects.filter(
+                invoice_id__in=[invoice_id for invoice_id, _ in columns_data]
+            ).values_list("pk", "invoice_id", "item_id", "column_name")
+        }
+        columns = {}
+        for invoice_id, data in columns_data:
+            for column_data in data.split("; "):
+                try:
+                    column_name, value, count = column_data.split("|")
+                except ValueError as err:
+                    raise ValidationError(f"Invalid column data:{column_data}") from err
+                item = last_items.get(invoice_id)
+                if not item:
+                    raise ValidationError(
+                        f"No matching invoice item for invoice {invoice_id}"
+                    )
+                key = (invoice_id, item.pk, column_name.strip())
+                column = columns.setdefault(
+                    key,
+                    Column(
+                        pk=existing.get(key),
+                        invoice_id=invoice_id,
+                        item_id=item.pk,
+                        column_name=key[2],
+                    ),
+                )
+                column.value = value.strip()
+                column.priority = count
+
+        Column.objects.bulk_update(
+            [column for column in columns.values() if column.pk],
+            ["value", "priority"],
+            batch_size=self.bulk_batch_size,
+        )
+        Column.objects.bulk_create(
+            [column for column in columns.values() if column.pk is None],
+            batch_size=self.bulk_batch_size,
+        )
+
+    def bulk_import_expenses(self, totals_data):
+        """Create or update the expenses of many invoices like
+        ``create_expenses``, with one upsert.
+        """
+        existing = {
+            expense.invoice_id: expense
+            for expense in Expense.objects.filter(
+                invoice_id__in=[invoice_id for invoice_id, _ in totals_data]
+            )
+        }
+        service = ExpenseService()
+        expenses = {}
+        for invoice_id, data in totals_data:
+            try:
+                subtotal, tax_percentage, discount_percentage, _concession = data.split(
+                    "|"
+                )
+                expense = existing.get(invoice_id) or Expense(invoice_id=invoice_id)
+                expense.tax_percentage = Decimal(tax_percentage)
+                expense.discount_percentage = Decimal(discount_percentage)
+                service.apply_totals(expense, Decimal(subtotal))
+            except (ValueError, ArithmeticError) as err:
+                raise ValidationError(f"Invalid totals data: {data}") from err
+            expenses[invoice_id] = expense
+
+        Expense.objects.bulk_update(
+            [expense for expense in expenses.values() if expense.pk],
+            ["tax_percentage", "discount_percentage", *ExpenseService.amount_fields],
+            batch_size=self.bulk_batch_size,
+        )
+        # Upsert, in case another import created the expense meanwhile
+        features = connections[router.db_for_write(Expense)].features
+        Expense.objects.bulk_create(
+            [expense for expense in expenses.values() if expense.pk is None],
+            batch_size=self.bulk_batch_size,
+            update_conflicts=True,
+            unique_fields=(
+                ["invoice"] if features.supports_update_conflicts_with_target else None
+            ),
+            update_fields=[
+                "tax_percentage",
+                "discount_percentage",
+                *ExpenseService.amount_fields,
+            ],
+        )
+        service.sync_invoices(expenses)
+
     # Export related data for items, columns, totals, and contacts
+    def get_queryset(self):
+        return self.with_export_relations(super().get_queryset())
+
+    def filter_export(self, queryset, **kwargs):
+        """Load the relations of querysets passed in, such as the admin's."""
+        return self.with_export_relations(super().filter_export(queryset, **kwargs))
+
+    def with_export_relations(self, queryset):
+        """Fetch everything the dehydrate methods read in a fixed number of
+        queries per page of invoices, whatever the number of invoices.
+        """
+        return queryset.select_related(
+            "category", "customer", "expense"
+        ).prefetch_related("items", "columns")
+
     def dehydrate_items(self, invoice):
-        items = Item.objects.filter(invoice=invoice)
         return "; ".join(
             [
                 f"{item.description}|{item.quantity}|{item.unit_price}|{item.total_price}"
-                for item in items
+                for item in invoice.items.all()
             ]
         )
 
     def dehydrate_columns(self, invoice):
-        columns = Column.objects.filter(invoice=invoice)
         return "; ".join(
             [
                 f"{column.column_name}|{column.value}|{column.priority}"
-                for column in columns
+                for column in invoice.columns.all()
             ]
         )
 
     def dehydrate_totals(self, invoice):
-        totals = Expense.objects.filter(invoice=invoice)
-        return "; ".join(
-            [
-                f"{total.subtotal}|{total.tax_percentage}|{total.discount_percentage}|{total.concession_percentage}"
-                for total in totals
-            ]
-        )
+        try:
+            total = invoice.expense
+        except Expense.DoesNotExist:
+            return ""
+        return f"{total.subtotal}|{total.tax_percentage}|{total.discount_percentage}|{total.concession_percentage}"
 
     def dehydrate_category(self, invoice):
         """Export category data as 'title|description' format."""
@@ -293,3 +545,17 @@ class InvoiceResource(resources.ModelResource):
     def dehydrate_contacts(self, invoice):
         """Export contacts JSON field."""
         return json.dumps(invoice.customer.contact)
+
+
+class BulkInvoiceResource(InvoiceResource):
+    """Import invoices writing their items, columns and totals in batches.
+
+    Suited to large spreadsheets: each batch of ``bulk_batch_size`` rows costs
+    a fixed number of queries for its related records, whatever the number of
+    items per invoice.
+    """
+
+    bulk_import = True
+
+    class Meta(InvoiceResource.Meta):
+        name = "Invoices (bulk import)"
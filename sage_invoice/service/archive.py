@@ -0,0 +1,76 @@
+import io
+import logging
+import time
+import zipfile
+from typing import Any, Iterable, Iterator, List, Tuple
+
+from .invoice_create import QuotationService
+from .pdf import PDFService, get_invoice_filename, get_pdf_filename
+
+logger = logging.getLogger(__name__)
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Write-only, non-seekable buffer drained after every archive entry.
+
+    Because ``tell`` and ``seek`` are unsupported, ``zipfile`` writes data
+    descriptors after each entry instead of seeking back to patch headers.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """Yield a ZIP archive chunk by chunk from ``(filename, content)`` pairs.
+
+    Each entry is compressed and yielded as soon as it is produced, so only
+    one entry is held in memory at a time.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for filename, content in entries:
+            info = zipfile.ZipInfo(filename, time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, content)
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+class ArchiveService:
+    """Service class to build ZIP archives of rendered invoices."""
+
+    formats = ("pdf", "html")
+
+    def iter_entries(
+        self, invoice_ids: Iterable[Any], file_format: str = "pdf"
+    ) -> Iterator[Tuple[str, bytes]]:
+        """Yield one ``(filename, content)`` pair per invoice."""
+        if file_format == "pdf":
+            for invoice, pdf in PDFService().render_pdfs(invoice_ids):
+                yield get_pdf_filename(invoice), pdf
+            return
+
+        service = QuotationService()
+        for invoice, context in service.build_contexts(invoice_ids):
+            html = service.render_invoice(invoice, context)
+            yield get_invoice_filename(invoice, "html"), html.encode()
+
+    def stream(
+        self, invoice_ids: Iterable[Any], file_format: str = "pdf"
+    ) -> Iterator[bytes]:
+        logger.info("Streaming %s invoice archive", file_format)
+        return stream_zip(self.iter_entries(invoice_ids, file_format))
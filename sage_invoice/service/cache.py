@@ -0,0 +1,117 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from jinja2 import Template
+
+logger = logging.getLogger(__name__)
+
+
+class RenderCache:
+    """Cache of rendered invoice HTML stored in a Django cache backend.
+
+    Each invoice has a single entry holding a fingerprint and the rendered
+    HTML. The fingerprint covers the full render context (invoice, customer,
+    items, columns and expense) plus the template file and its mtime, so a
+    stale entry is never served even if an invalidation signal was missed.
+    Entries are also deleted from ``sage_invoice.signals`` whenever related
+    rows are saved or deleted.
+
+    The backend alias is read from ``SAGE_INVOICE_RENDER_CACHE`` (``"default"``
+    when missing); set it to ``None`` to disable caching. Renders that differ
+    for the same invoice, such as HTML with embedded images for PDFs, are kept
+    under their own ``variant`` key so they do not evict each other.
+    """
+
+    key_prefix = "sage_invoice:render"
+    variants = ("embedded",)
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self) -> Optional[BaseCache]:
+        alias = getattr(settings, "SAGE_INVOICE_RENDER_CACHE", "default")
+        if alias is None:
+            return None
+        return caches[alias]
+
+    def make_key(self, invoice_id: Any, variant: Optional[str] = None) -> str:
+        if variant:
+            return f"{self.key_prefix}:{invoice_id}:{variant}"
+        return f"{self.key_prefix}:{invoice_id}"
+
+    def fingerprint(self, template: Template, context: Dict[str, Any]) -> str:
+        """Return a digest of the template file and the render context."""
+        digest = hashlib.sha256()
+        if template.filename:
+            digest.update(template.filename.encode())
+            digest.update(str(os.path.getmtime(template.filename)).encode())
+        digest.update(
+            json.dumps(context, sort_keys=True, default=self._encode).encode()
+        )
+        return digest.hexdigest()
+
+    def get_or_render(
+        self,
+        invoice_id: Any,
+        template: Template,
+        context: Dict[str, Any],
+        variant: Optional[str] = None,
+    ) -> str:
+        """Return the cached HTML for the invoice, rendering it on a miss."""
+        backend = self.backend
+        if backend is None:
+            return template.render(context)
+
+        key = self.make_key(invoice_id, variant)
+        fingerprint = self.fingerprint(template, context)
+        entry = backend.get(key)
+        if entry and entry[0] == fingerprint:
+            self._count(hit=True)
+            return entry[1]
+
+        self._count(hit=False)
+        rendered = template.render(context)
+        backend.set(key, (fingerprint, rendered))
+        return rendered
+
+    def invalidate(self, invoice_id: Any) -> None:
+        backend = self.backend
+        if backend is not None and invoice_id is not None:
+            logger.debug("Invalidating rendered invoice %s", invoice_id)
+            backend.delete_many(
+                [self.make_key(invoice_id)]
+                + [self.make_key(invoice_id, variant) for variant in self.variants]
+            )
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @staticmethod
+    def _encode(value: Any) -> Any:
+        if isinstance(value, (set, frozenset)):
+            return sorted(value)
+        return str(value)
+
+
+render_cache = RenderCache()
@@ -0,0 +1,71 @@
+from collections import defaultdict
+from decimal import Decimal
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+EMPTY_CUSTOM_DATA: Mapping[str, str] = MappingProxyType({})
+
+ITEM_FIELDS = (
+    "id",
+    "invoice_id",
+    "description",
+    "quantity",
+    "measurement",
+    "unit_price",
+    "total_price",
+)
+COLUMN_FIELDS = ("item_id", "column_name", "value")
+
+
+class LineItem(NamedTuple):
+    """A single invoice line as seen by the templates.
+
+    Being a tuple, it costs a fraction of the per-item dict it replaces while
+    templates keep using attribute access (``item.description``).
+    """
+
+    description: str
+    quantity: Optional[int]
+    measurement: str
+    unit_price: Decimal
+    total_price: Decimal
+    custom_data: Mapping[str, str]
+
+
+def build_line_items(
+    item_rows: Iterable[Tuple], column_rows: Iterable[Tuple]
+) -> Dict[Any, List[LineItem]]:
+    """Group ``values_list`` rows into line items keyed by invoice id.
+
+    Args:
+        item_rows: Rows of ``ITEM_FIELDS`` from the item table.
+        column_rows: Rows of ``COLUMN_FIELDS`` ordered by priority.
+
+    Returns:
+        Dict[Any, List[LineItem]]: The line items of each invoice.
+    """
+    custom_data: Dict[Any, Dict[str, str]] = defaultdict(dict)
+    for item_id, column_name, value in column_rows:
+        custom_data[item_id][column_name] = value
+
+    line_items: Dict[Any, List[LineItem]] = defaultdict(list)
+    for (
+        item_id,
+        invoice_id,
+        description,
+        quantity,
+        measurement,
+        unit_price,
+        total_price,
+    ) in item_rows:
+        line_items[invoice_id].append(
+            LineItem(
+                description,
+                quantity,
+                measurement or "",
+                unit_price,
+                total_price,
+                custom_data.get(item_id, EMPTY_CUSTOM_DATA),
+            )
+        )
+    return line_items
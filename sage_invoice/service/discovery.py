@@ -1,7 +1,64 @@
+import hashlib
+import json
+import logging
 import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
 from django.apps import apps
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def get_manifest_path() -> Optional[str]:
+    return getattr(settings, "SAGE_INVOICE_TEMPLATE_MANIFEST", None)
+
+
+def load_manifest(path: str) -> Optional[Dict[str, Any]]:
+    """Read a manifest written by ``build_invoice_manifest``.
+
+    Returns:
+        Optional[Dict[str, Any]]: The manifest, or None if it is missing or was
+        written by an incompatible version.
+    """
+    try:
+        with open(path, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError) as error:
+        logger.warning("Could not read template manifest %s: %s", path, error)
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        logger.warning("Ignoring template manifest %s of another version", path)
+        return None
+    return manifest
+
+
+def write_manifest(path: str, manifest: Dict[str, Any]) -> bool:
+    """Atomically write ``manifest`` to ``path`` unless it is unchanged.
+
+    Returns:
+        bool: Whether the file was written.
+    """
+    content = json.dumps(manifest, indent=2, sort_keys=True)
+    try:
+        with open(path, encoding="utf-8") as manifest_file:
+            if manifest_file.read() == content:
+                return False
+    except OSError:
+        pass
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as manifest_file:
+        manifest_file.write(content)
+    os.replace(temp_path, path)
+    return True
+
+
 class JinjaTemplateDiscovery:
     def __init__(self):
         self.default_template_dir = "default_invoices"  # inside package
@@ -19,6 +76,55 @@ class JinjaTemplateDiscovery:
         )
         return self._find_templates_in_directory(default_path, is_receipt)
 
+    def get_template_dirs(self):
+        """Return the package default directory followed by every app's custom
+        template directory that exists on disk.
+        """
+        template_dirs = [
+            os.path.join(
+                apps.get_app_config("sage_invoice").path,
+                "templates",
+                self.default_template_dir,
+            )
+        ]
+        for app_config in apps.get_app_configs():
+            template_dir = os.path.join(
+                app_config.path, "templates", self.sage_template_dir
+            )
+            if os.path.exists(template_dir):
+                template_dirs.append(template_dir)
+        return template_dirs
+
+    def build_manifest(self):
+        """Scan the default and custom template directories and return a
+        manifest of every template with the app and directory it lives in.
+        """
+        sources = [
+            (apps.get_app_config("sage_invoice"), self.default_template_dir, None)
+        ]
+        sources += [
+            (app_config, self.sage_template_dir, self.sage_template_prefix)
+            for app_config in apps.get_app_configs()
+        ]
+
+        templates = []
+        for app_config, directory, prefix in sources:
+            path = os.path.join(app_config.path, "templates", directory)
+            if not os.path.isdir(path):
+                continue
+            filenames = sorted(os.listdir(path))
+            for is_receipt in (False, True):
+                templates += [
+                    {
+                        "name": name,
+                        "app": app_config.label,
+                        "directory": directory,
+                        "receipt": is_receipt,
+                    }
+                    for name in self._filter_templates(filenames, is_receipt, prefix)
+                ]
+        return {"version": MANIFEST_VERSION, "templates": templates}
+
     def get_custom_templates(self, is_receipt=False):
         """Return a list of custom templates found in each app's `templates/` directory."""
         template_choices = []
@@ -42,8 +148,15 @@ class JinjaTemplateDiscovery:
         if not os.path.exists(directory):
             return []
 
+        return self._filter_templates(os.listdir(directory), is_receipt, prefix)
+
+    def _filter_templates(self, filenames, is_receipt=False, prefix=None):
+        """
+        Keep the .jinja2 files matching `prefix` and `is_receipt` and return them
+        without the .jinja2 extension.
+        """
         templates = []
-        for filename in os.listdir(directory):
+        for filename in filenames:
             if filename.endswith(".jinja2") and (
                 not prefix or filename.startswith(prefix)
             ):
@@ -57,3 +170,178 @@ class JinjaTemplateDiscovery:
         filenames = list(map(lambda x: x.replace(".jinja2", ""), templates))
 
         return filenames
+
+
+class TemplateChoiceRegistry:
+    """Process-level cache of the template choices offered to the admin.
+
+    Directory listings are kept together with the directory's mtime and the
+    assembled choices with the mtimes they were built from, so a call only
+    costs one ``stat`` per template directory unless a template was added,
+    removed or renamed since the previous call. Each set of choices carries a
+    digest of its content, usable as an HTTP validator.
+
+    When ``SAGE_INVOICE_TEMPLATE_MANIFEST`` names a manifest built with
+    ``python manage.py build_invoice_manifest``, the choices are read from it
+    once per process instead of scanning. With ``DEBUG`` enabled the
+    directories are scanned as usual and the manifest is rewritten whenever
+    they change.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._manifests: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._directories: Dict[Tuple[str, str], List[Tuple[str, Optional[str]]]] = {}
+        self._listings: Dict[str, Tuple[int, Tuple[str, ...]]] = {}
+        self._choices: Dict[Tuple, Tuple[Tuple, List[Tuple[str, str]], str]] = {}
+
+    def get_choices(self, is_receipt: bool = False) -> List[Tuple[str, str]]:
+        """Return the default and custom templates as ``(value, label)`` pairs.
+
+        Args:
+            is_receipt (bool): Return receipt templates instead of quotations.
+
+        Returns:
+            List[Tuple[str, str]]: The choices, default templates first.
+        """
+        return list(self._get_entry(is_receipt)[1])
+
+    def get_digest(self, is_receipt: bool = False) -> str:
+        """Return a digest that changes whenever ``get_choices`` would."""
+        return self._get_entry(is_receipt)[2]
+
+    def get_manifest(self) -> Dict[str, Any]:
+        """Return the configured manifest, or one built by scanning."""
+        manifest_path = get_manifest_path()
+        if manifest_path and not settings.DEBUG:
+            manifest = self._load_manifest(manifest_path)
+            if manifest is not None:
+                return manifest
+        return JinjaTemplateDiscovery().build_manifest()
+
+    def _get_entry(self, is_receipt: bool) -> Tuple[Tuple, List[Tuple[str, str]], str]:
+        manifest_path = get_manifest_path()
+        if manifest_path and not settings.DEBUG:
+            entry = self._get_manifest_entry(manifest_path, is_receipt)
+            if entry is not None:
+                return entry
+
+        discovery = JinjaTemplateDiscovery()
+        directories = self.get_directories(discovery)
+        mtimes = tuple(self._get_mtime(path) for path, _ in directories)
+        key = (
+            is_receipt,
+            discovery.sage_template_dir,
+            discovery.sage_template_prefix,
+        )
+
+        cached = self._choices.get(key)
+        if cached is not None and cached[0] == mtimes:
+            return cached
+
+        choices = []
+        for (path, prefix), mtime in zip(directories, mtimes):
+            if mtime is None:
+                continue
+            templates = discovery._filter_templates(
+                self._list_directory(path, mtime), is_receipt, prefix
+            )
+            choices += [(template, template) for template in templates]
+
+        if manifest_path and settings.DEBUG:
+            if write_manifest(manifest_path, discovery.build_manifest()):
+                logger.info("Rebuilt template manifest %s", manifest_path)
+        return self._store(key, mtimes, choices)
+
+    def _get_manifest_entry(
+        self, path: str, is_receipt: bool
+    ) -> Optional[Tuple[Tuple, List[Tuple[str, str]], str]]:
+        key = (is_receipt, path)
+        cached = self._choices.get(key)
+        if cached is not None:
+            return cached
+
+        manifest = self._load_manifest(path)
+        if manifest is None:
+            return None
+        choices = [
+            (template["name"], template["name"])
+            for template in manifest["templates"]
+            if template["receipt"] == is_receipt
+        ]
+        return self._store(key, (), choices)
+
+    def _load_manifest(self, path: str) -> Optional[Dict[str, Any]]:
+        if path not in self._manifests:
+            manifest = load_manifest(path)
+            with self._lock:
+                self._manifests[path] = manifest
+        return self._manifests[path]
+
+    def _store(
+        self, key: Tuple, mtimes: Tuple, choices: List[Tuple[str, str]]
+    ) -> Tuple[Tuple, List[Tuple[str, str]], str]:
+        digest = hashlib.sha256(json.dumps(choices).encode()).hexdigest()
+        entry = (mtimes, choices, digest)
+        with self._lock:
+            self._choices[key] = entry
+        return entry
+
+    def get_directories(
+        self, discovery: JinjaTemplateDiscovery
+    ) -> List[Tuple[str, Optional[str]]]:
+        """Return every candidate template directory with its filename prefix.
+
+        Custom directories are listed whether or not they exist yet, so one
+        created later is picked up by its mtime like any other change.
+        """
+        key = (discovery.sage_template_dir, discovery.sage_template_prefix)
+        directories = self._directories.get(key)
+        if directories is None:
+            directories = [
+                (
+                    os.path.join(
+                        apps.get_app_config("sage_invoice").path,
+                        "templates",
+                        discovery.default_template_dir,
+                    ),
+                    None,
+                )
+            ]
+            directories += [
+                (
+                    os.path.join(
+                        app_config.path, "templates", discovery.sage_template_dir
+                    ),
+                    discovery.sage_template_prefix,
+                )
+                for app_config in apps.get_app_configs()
+            ]
+            with self._lock:
+                self._directories[key] = directories
+        return directories
+
+    def clear(self) -> None:
+        with self._lock:
+            self._manifests.clear()
+            self._directories.clear()
+            self._listings.clear()
+            self._choices.clear()
+
+    def _list_directory(self, path: str, mtime: int) -> Tuple[str, ...]:
+        listing = self._listings.get(path)
+        if listing is None or listing[0] != mtime:
+            listing = (mtime, tuple(sorted(os.listdir(path))))
+            with self._lock:
+                self._listings[path] = listing
+        return listing[1]
+
+    @staticmethod
+    def _get_mtime(path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+
+template_registry = TemplateChoiceRegistry()
@@ -0,0 +1,104 @@
+import logging
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.templatetags.static import static
+from jinja2 import (
+    BaseLoader,
+    BytecodeCache,
+    ChoiceLoader,
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    ModuleLoader,
+    select_autoescape,
+)
+
+from .loader import TemplateIndexLoader, template_index
+
+logger = logging.getLogger(__name__)
+
+_environments: Dict[Tuple[Optional[Tuple[str, ...]], str], Environment] = {}
+_lock = threading.Lock()
+
+
+def get_bytecode_cache() -> Optional[BytecodeCache]:
+    """Return the on-disk bytecode cache shared by every environment.
+
+    The directory is read from ``SAGE_INVOICE_BYTECODE_CACHE_DIR``. When the
+    setting is missing, Jinja2 picks a per-user directory in the system temp
+    folder. Setting it to ``False`` disables the cache.
+    """
+    directory = getattr(settings, "SAGE_INVOICE_BYTECODE_CACHE_DIR", None)
+    if directory is False:
+        return None
+    if directory is None:
+        return FileSystemBytecodeCache()
+    return FileSystemBytecodeCache(str(directory))
+
+
+def get_compiled_templates_dir() -> Optional[str]:
+    """Return the directory written by ``compile_invoice_templates``, if any."""
+    directory = getattr(settings, "SAGE_INVOICE_COMPILED_TEMPLATES_DIR", None)
+    return str(directory) if directory else None
+
+
+def create_environment(
+    search_path: Optional[Sequence[str]] = None, compiled_dir: Optional[str] = None
+) -> Environment:
+    """Build a Jinja2 environment loading templates from ``search_path``, or
+    through the invoice template index when no search path is given.
+
+    When ``compiled_dir`` is given, precompiled template modules found there
+    are used first and the source directories are only a fallback.
+    """
+    loader: BaseLoader
+    if search_path is None:
+        loader = TemplateIndexLoader(template_index)
+    else:
+        loader = FileSystemLoader(list(search_path))
+    if compiled_dir:
+        loader = ChoiceLoader([ModuleLoader(compiled_dir), loader])
+
+    environment = Environment(
+        loader=loader,
+        autoescape=select_autoescape(["html", "xml"]),
+        bytecode_cache=get_bytecode_cache(),
+    )
+    environment.globals["static"] = static
+    return environment
+
+
+def get_environment(search_path: Optional[Sequence[str]] = None) -> Environment:
+    """Return the process-wide Jinja2 environment for ``search_path``, or for
+    the invoice template index when no search path is given.
+
+    Environments are created once per distinct set of template directories and
+    reused by every ``QuotationService`` in the process, so compiled templates
+    survive between requests. The lookup is guarded by a lock and is safe to
+    call from several threads.
+    """
+    compiled_dir = get_compiled_templates_dir()
+    paths = None if search_path is None else tuple(str(path) for path in search_path)
+    key = (paths, compiled_dir or "")
+    environment = _environments.get(key)
+    if environment is not None:
+        return environment
+
+    with _lock:
+        environment = _environments.get(key)
+        if environment is None:
+            logger.info("Creating Jinja2 environment for: %s", key)
+            environment = create_environment(paths, compiled_dir)
+            _environments[key] = environment
+    return environment
+
+
+def clear_environments() -> None:
+    """Drop every cached environment and the template index, e.g. after
+    settings change in tests.
+    """
+    with _lock:
+        _environments.clear()
+    template_index.clear()
@@ -0,0 +1,121 @@
+import csv
+import io
+import json
+import logging
+import zlib
+from itertools import chain
+from typing import Any, BinaryIO, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+
+from sage_invoice.resource import InvoiceResource
+
+logger = logging.getLogger(__name__)
+
+
+class ExportService:
+    """Stream invoices as CSV or JSON Lines with the fields of
+    ``InvoiceResource``.
+
+    Unlike ``InvoiceResource.export``, which builds a whole ``tablib`` dataset
+    first, invoices are read with ``QuerySet.iterator`` and encoded one chunk
+    at a time, so memory use does not grow with the number of invoices. Each
+    chunk of ``chunk_size`` invoices costs the resource's usual fixed number
+    of queries.
+    """
+
+    formats = ("csv", "jsonl")
+    content_types = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+    def __init__(
+        self,
+        file_format: str = "csv",
+        compress: bool = False,
+        chunk_size: Optional[int] = None,
+        resource: Optional[InvoiceResource] = None,
+    ) -> None:
+        if file_format not in self.formats:
+            raise ValueError(f"Unsupported format {file_format!r}.")
+        self.file_format = file_format
+        self.compress = compress
+        self.chunk_size = chunk_size or getattr(
+            settings, "SAGE_INVOICE_EXPORT_CHUNK_SIZE", 500
+        )
+        self.resource = resource or InvoiceResource()
+        # Invoices written by the last export
+        self.row_count = 0
+
+    @property
+    def content_type(self) -> str:
+        if self.compress:
+            return "application/gzip"
+        return self.content_types[self.file_format]
+
+    def get_filename(self, name: str = "invoices") -> str:
+        filename = f"{name}.{self.file_format}"
+        return f"{filename}.gz" if self.compress else filename
+
+    def iter_rows(self, queryset: Optional[QuerySet] = None) -> Iterator[List[Any]]:
+        """Yield the exported values of each invoice, a chunk at a time."""
+        if queryset is None:
+            queryset = self.resource.get_queryset()
+        queryset = self.resource.filter_export(queryset)
+        self.row_count = 0
+        # Prefetching runs once per chunk when a chunk size is given
+        for invoice in queryset.iterator(chunk_size=self.chunk_size):
+            self.row_count += 1
+            yield self.resource.export_resource(invoice)
+
+    def iter_lines(self, queryset: Optional[QuerySet] = None) -> Iterator[str]:
+        """Yield the header, for CSV, then one encoded line per invoice."""
+        headers = self.resource.get_export_headers()
+        if self.file_format == "jsonl":
+            for row in self.iter_rows(queryset):
+                yield json.dumps(
+                    dict(zip(headers, row)), cls=DjangoJSONEncoder, ensure_ascii=False
+                ) + "\n"
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in chain([headers], self.iter_rows(queryset)):
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    def stream(self, queryset: Optional[QuerySet] = None) -> Iterator[bytes]:
+        """Yield the encoded export one chunk of invoices at a time,
+        gzip-compressed if ``compress`` is set.
+        """
+        logger.info("Streaming %s invoice export", self.file_format)
+        compressor = (
+            zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if self.compress else None
+        )
+        lines: List[str] = []
+        for line in self.iter_lines(queryset):
+            lines.append(line)
+            if len(lines) >= self.chunk_size:
+                yield from self._encode(lines, compressor)
+                lines = []
+        yield from self._encode(lines, compressor)
+        if compressor is not None:
+            yield compressor.flush()
+
+    def write(self, file: BinaryIO, queryset: Optional[QuerySet] = None) -> int:
+        """Write the export to a binary file and return the number of
+        invoices written.
+        """
+        for chunk in self.stream(queryset):
+            file.write(chunk)
+        return self.row_count
+
+    def _encode(self, lines: List[str], compressor) -> Iterator[bytes]:
+        data = "".join(lines).encode()
+        if compressor is not None:
+            data = compressor.compress(data)
+        # The compressor buffers small inputs; skip the empty chunks
+        if data:
+            yield data
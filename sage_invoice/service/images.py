@@ -0,0 +1,171 @@
+import base64
+import hashlib
+import io
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RENDITION_SIZES: Dict[str, Tuple[int, int]] = {
+    "logo": (400, 200),
+    "signature": (400, 200),
+    "stamp": (300, 300),
+}
+
+
+@lru_cache(maxsize=256)
+def _encode_data_uri(storage: Storage, name: str, digest: Optional[str]) -> str:
+    # A regenerated rendition keeps its name, so the content digest is part of
+    # the key to keep stale entries from being served
+    with storage.open(name, "rb") as image_file:
+        content = image_file.read()
+    mime_type = "image/png" if name.endswith(".png") else "image/jpeg"
+    return f"data:{mime_type};base64,{base64.b64encode(content).decode()}"
+
+
+class ImageRenditionService:
+    """Service class to create and serve right-sized copies of invoice images.
+
+    Renditions are stored next to the original upload with a ``_rendition``
+    suffix. PNG uploads stay optimized PNG so transparency survives, anything
+    else is saved as JPEG. Sizes can be overridden per field with
+    ``SAGE_INVOICE_IMAGE_RENDITIONS``.
+
+    The rendition of each field is recorded in ``Invoice.image_renditions``
+    together with the upload it was made from and a digest of its content, so
+    rendering an invoice never asks the storage whether a file exists.
+    """
+
+    fields = ("logo", "signature", "stamp")
+    jpeg_quality = 85
+
+    def __init__(self) -> None:
+        self.sizes = {
+            **DEFAULT_RENDITION_SIZES,
+            **getattr(settings, "SAGE_INVOICE_IMAGE_RENDITIONS", {}),
+        }
+
+    def get_uploads(self, invoice: Any) -> Set[str]:
+        """Return the image fields holding a file that is not saved yet.
+
+        Call it before the invoice is saved: storages that overwrite files
+        keep the name of a re-uploaded image, so the name alone cannot tell
+        that the rendition is out of date.
+        """
+        return {
+            field_name
+            for field_name in self.fields
+            if getattr(invoice, field_name)
+            and not getattr(invoice, field_name)._committed
+        }
+
+    def process(self, invoice: Any, uploads: Iterable[str] = ()) -> None:
+        """Create the renditions of images uploaded since the last call and
+        record them on the invoice.
+
+        Args:
+            invoice (Invoice): The saved invoice.
+            uploads (Iterable[str]): Fields returned by ``get_uploads`` before
+                the save; their renditions are created again even when the
+                file name did not change.
+        """
+        renditions = dict(invoice.image_renditions or {})
+        for field_name in self.fields:
+            field_file = getattr(invoice, field_name)
+            if not field_file:
+                renditions.pop(field_name, None)
+            elif (
+                field_name in uploads
+                or renditions.get(field_name, {}).get("source") != field_file.name
+            ):
+                # A failed rendition is recorded too, so it is not retried on
+                # every save of the same upload
+                renditions[field_name] = {
+                    "source": field_file.name,
+                    **(
+                        self.create_rendition(field_file, self.sizes[field_name])
+                        or {"name": None}
+                    ),
+                }
+
+        if renditions != (invoice.image_renditions or {}):
+            invoice.image_renditions = renditions
+            # A plain UPDATE, so saving the invoice again fires no signals
+            type(invoice).objects.filter(pk=invoice.pk).update(
+                image_renditions=renditions
+            )
+
+    def get_rendition(self, invoice: Any, field_name: str) -> Optional[Dict[str, Any]]:
+        """Return the recorded rendition of an invoice image, or None when the
+        current upload has none.
+        """
+        field_file = getattr(invoice, field_name)
+        entry = (invoice.image_renditions or {}).get(field_name)
+        if not field_file or not entry or entry.get("source") != field_file.name:
+            return None
+        return entry if entry.get("name") else None
+
+    def rendition_name(self, field_file: Any) -> str:
+        root, ext = os.path.splitext(field_file.name)
+        ext = ".png" if ext.lower() == ".png" else ".jpg"
+        return f"{root}_rendition{ext}"
+
+    def create_rendition(
+        self, field_file: Any, size: Tuple[int, int]
+    ) -> Optional[Dict[str, str]]:
+        """Resize and compress ``field_file`` and save it to the same storage.
+
+        Returns:
+            Dict[str, str]: The ``name`` and content ``digest`` of the
+            rendition, or None when the image cannot be read.
+        """
+        try:
+            with field_file.storage.open(field_file.name, "rb") as source:
+                image = ImageOps.exif_transpose(Image.open(source))
+                image.thumbnail(size)
+                buffer = io.BytesIO()
+                name = self.rendition_name(field_file)
+                if name.endswith(".png"):
+                    image.save(buffer, format="PNG", optimize=True)
+                else:
+                    image.convert("RGB").save(
+                        buffer, format="JPEG", quality=self.jpeg_quality, optimize=True
+                    )
+        except (OSError, UnidentifiedImageError) as error:
+            logger.error(
+                "Could not create rendition for %s: %s", field_file.name, error
+            )
+            return None
+
+        # Keep the predictable name so lookups never need to list the storage
+        content = buffer.getvalue()
+        field_file.storage.delete(name)
+        return {
+            "name": field_file.storage.save(name, ContentFile(content)),
+            "digest": hashlib.sha256(content).hexdigest(),
+        }
+
+    def get_url(
+        self, invoice: Any, field_name: str, embed: bool = False
+    ) -> Optional[str]:
+        """Return the URL (or data URI) of the rendition of an invoice image,
+        falling back to the original upload when it has no rendition.
+        """
+        field_file = getattr(invoice, field_name)
+        if not field_file:
+            return None
+        rendition = self.get_rendition(invoice, field_name)
+        if rendition is None:
+            return field_file.url
+        if embed:
+            return _encode_data_uri(
+                field_file.storage, rendition["name"], rendition.get("digest")
+            )
+        return field_file.storage.url(rendition["name"])
@@ -1,34 +1,62 @@
+import asyncio
 import logging
-import os
-from typing import Any, Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import QuerySet
-from jinja2 import Environment, FileSystemLoader, select_autoescape
-from jinja2.exceptions import TemplateNotFound
 
-from sage_invoice.models import Column
+from sage_invoice.models import Column, Expense, Invoice, Item
 
+from .cache import render_cache
+from .context import COLUMN_FIELDS, ITEM_FIELDS, LineItem, build_line_items
 from .discovery import JinjaTemplateDiscovery
+from .environment import get_environment
+from .images import ImageRenditionService
+from .loader import template_index
 
 logger = logging.getLogger(__name__)
 
+_render_executor: Optional[ThreadPoolExecutor] = None
+_render_executor_lock = threading.Lock()
+
+
+def get_async_concurrency() -> int:
+    return getattr(settings, "SAGE_INVOICE_ASYNC_CONCURRENCY", 4)
+
+
+def get_render_executor() -> ThreadPoolExecutor:
+    """Return the thread pool used to render templates for async views."""
+    global _render_executor
+    with _render_executor_lock:
+        if _render_executor is None:
+            _render_executor = ThreadPoolExecutor(
+                max_workers=get_async_concurrency(),
+                thread_name_prefix="sage_invoice_render",
+            )
+    return _render_executor
+
 
 class QuotationService:
     """Service class to handle the generation and rendering of quotations."""
 
-    def __init__(self) -> None:
+    def __init__(self, embed_images: bool = False) -> None:
         """Initialize the QuotationService with the template discovery and
-        Jinja2.
+        the shared Jinja2 environment for the discovered template directories.
+
+        Args:
+            embed_images (bool): Reference the logo, signature and stamp
+                renditions as data URIs instead of URLs.
         """
         logger.info("Initializing QuotationService")
+        self.embed_images = embed_images
+        self.images = ImageRenditionService()
         self.template_discovery = JinjaTemplateDiscovery()
-        self.env = Environment(
-            loader=FileSystemLoader(self.template_discovery.sage_template_dir),
-            autoescape=select_autoescape(
-                ["html", "xml"]
-            ),  # Enable autoescape for HTML and XML templates
-        )
+        self.template_index = template_index
+        self.env = get_environment()
         logger.info(
             "Template discovery set to directory: %s",
             self.template_discovery.sage_template_dir,
@@ -48,65 +76,173 @@ class QuotationService:
         """
         logger.info("Rendering quotation")
         invoice = queryset.first()
-        context = self.render_context(queryset)
-        is_receipt = invoice.receipt
-        template_number = "".join(filter(str.isdigit, invoice.template_choice))
-        logger.info("Selected template number: %s", template_number)
-        selected_template = self.template_discovery.get_template_path(
-            template_number, is_receipt
+        if invoice is None:
+            raise ObjectDoesNotExist("No invoice to render a quotation for.")
+        return self.render_invoice(invoice)
+
+    def render_invoice(
+        self, invoice: Any, context: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Render a single invoice with the template its ``template_choice``
+        and ``receipt`` flag resolve to in the template index.
+
+        Args:
+            invoice (Invoice): The invoice to render.
+            context (Dict[str, Any], optional): A context prepared by
+                ``build_contexts``; built from the invoice when omitted.
+
+        Returns:
+            str: The rendered HTML of the invoice.
+
+        Raises:
+            TemplateNotFound: If the selected template is not found.
+        """
+        template = self.env.get_template(
+            self.template_index.resolve(invoice.template_choice, invoice.receipt)
+        )
+        if context is None:
+            context = self.render_context(invoice)
+        variant = "embedded" if self.embed_images else None
+        return render_cache.get_or_render(invoice.pk, template, context, variant)
+
+    def get_invoice_queryset(self, invoice_ids: Iterable[Any]) -> QuerySet:
+        """Return the invoices with their customer and expense joined."""
+        return Invoice.objects.filter(id__in=list(invoice_ids)).select_related(
+            "customer", "expense"
+        )
+
+    def load_line_items(self, invoice_ids: Iterable[Any]) -> Dict[Any, List[LineItem]]:
+        """Load the line items of many invoices with two ``values_list`` queries.
+
+        No model instances are built for items or columns; rows are grouped in
+        Python into compact ``LineItem`` tuples keyed by invoice id.
+        """
+        invoice_ids = list(invoice_ids)
+        item_rows = (
+            Item.objects.filter(invoice_id__in=invoice_ids)
+            .order_by("pk")
+            .values_list(*ITEM_FIELDS)
+        )
+        column_rows = (
+            Column.objects.filter(invoice_id__in=invoice_ids)
+            .order_by("priority")
+            .values_list(*COLUMN_FIELDS)
         )
-        if not selected_template:
-            logger.error("Template %s not found", invoice.template_choice)
-            raise TemplateNotFound(f"Template {invoice.template_choice} not found.")
-        template = self.env.get_template(os.path.basename(selected_template))
-        logger.info("Rendering template: %s", selected_template)
+        return build_line_items(item_rows, column_rows)
 
-        return template.render(context)
+    def build_contexts(
+        self, invoice_ids: Iterable[Any]
+    ) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+        """Yield ``(invoice, context)`` pairs for many invoices at once.
 
-    def render_context(self, queryset: QuerySet) -> Dict[str, Any]:
+        Invoices are yielded in the order of ``invoice_ids``; ids that do not
+        exist are skipped. Ids are loaded in chunks of
+        ``SAGE_INVOICE_RENDER_CHUNK_SIZE``, and each chunk costs three
+        queries however many items or columns are involved.
+
+        Args:
+            invoice_ids (Iterable): The primary keys of the invoices to render.
+
+        Yields:
+            Tuple[Invoice, Dict[str, Any]]: Each invoice with its context.
+        """
+        for chunk in self.iter_chunks(invoice_ids):
+            invoices = {
+                str(invoice.pk): invoice for invoice in self.get_invoice_queryset(chunk)
+            }
+            line_items = self.load_line_items(invoices)
+            logger.info("Preparing context data for %s invoices", len(invoices))
+
+            for invoice_id in chunk:
+                invoice = invoices.get(invoice_id)
+                if invoice is None:
+                    continue
+                yield invoice, self.render_context(
+                    invoice, line_items.get(invoice.pk, [])
+                )
+
+    async def arender_invoices(
+        self, invoice_ids: Iterable[Any]
+    ) -> List[Tuple[Any, str]]:
+        """Render many invoices concurrently from async code.
+
+        Data is loaded with the async ORM, chunk by chunk, and every template
+        render runs on the shared render executor. At most
+        ``SAGE_INVOICE_ASYNC_CONCURRENCY`` renders of this call run at once.
+
+        Args:
+            invoice_ids (Iterable): The primary keys of the invoices to render.
+
+        Returns:
+            List[Tuple[Invoice, str]]: Each invoice with its rendered HTML, in
+            the order of ``invoice_ids``.
+        """
+        loop = asyncio.get_running_loop()
+        executor = get_render_executor()
+        semaphore = asyncio.Semaphore(get_async_concurrency())
+
+        async def render(invoice: Any, context: Dict[str, Any]) -> Tuple[Any, str]:
+            async with semaphore:
+                html = await loop.run_in_executor(
+                    executor, self.render_invoice, invoice, context
+                )
+            return invoice, html
+
+        tasks = []
+        for chunk in self.iter_chunks(invoice_ids):
+            invoices = {
+                str(invoice.pk): invoice
+                async for invoice in self.get_invoice_queryset(chunk)
+            }
+            line_items = await sync_to_async(self.load_line_items)(list(invoices))
+            for invoice_id in chunk:
+                invoice = invoices.get(invoice_id)
+                if invoice is not None:
+                    context = self.render_context(
+                        invoice, line_items.get(invoice.pk, [])
+                    )
+                    tasks.append(asyncio.ensure_future(render(invoice, context)))
+
+        return list(await asyncio.gather(*tasks))
+
+    def iter_chunks(self, invoice_ids: Iterable[Any]) -> Iterator[List[str]]:
+        """Split ids into lists of ``SAGE_INVOICE_RENDER_CHUNK_SIZE``."""
+        invoice_ids = [str(invoice_id) for invoice_id in invoice_ids]
+        chunk_size = getattr(settings, "SAGE_INVOICE_RENDER_CHUNK_SIZE", 100)
+
+        for start in range(0, len(invoice_ids), chunk_size):
+            yield invoice_ids[start : start + chunk_size]
+
+    def render_context(
+        self, queryset: QuerySet, line_items: Optional[List[LineItem]] = None
+    ) -> Dict[str, Any]:
         """Prepare the context data for rendering a quotation.
 
         Args:
             queryset (QuerySet): A queryset containing the invoice(s).
+            line_items (List[LineItem], optional): The invoice's items loaded
+                by ``load_line_items``; queried when omitted.
 
         Returns:
             Dict[str, Any]: The context data for rendering the quotation.
         """
         logger.info("Preparing context data for quotation")
         invoice = queryset
-        total = invoice.total
-        items = invoice.items.all()
-        email = None
-        phone = ""
-        item_list = []
+        total = self._get_related(invoice, "expense") or Expense()
+        customer = self._get_related(invoice, "customer")
+        if line_items is None:
+            line_items = self.load_line_items([invoice.pk]).get(invoice.pk, [])
         custom_columns = set()
         additional_fields = invoice.notes if hasattr(invoice, "notes") else []
-        contacts = invoice.contacts
-
-        for contact in contacts:
-            if "@" in contact and not email:
-                email = contact
-            elif contact.isdigit() and not phone:
-                phone = contact
-
-        for item in items:
-            custom_data = Column.objects.filter(item=item).order_by("priority")
-            custom_fields = {data.column_name: data.value for data in custom_data}
-            custom_columns.update(custom_fields.keys())
-            item_dict = {
-                "description": item.description,
-                "quantity": item.quantity,
-                "measurement": item.measurement if item.measurement else "",
-                "unit_price": item.unit_price,
-                "total_price": item.total_price,
-                "custom_data": custom_fields,
-            }
-            item_list.append(item_dict)
+        email, phone = self._get_contacts(customer)
+
+        for item in line_items:
+            custom_columns.update(item.custom_data)
 
         context = {
             "title": invoice.title,
             "tracking_code": invoice.tracking_code,
-            "items": item_list,
+            "items": line_items,
             "subtotal": total.subtotal,
             "tax_percentage": total.tax_percentage,
             "tax_amount": total.tax_amount,
@@ -116,18 +252,34 @@ class QuotationService:
             "concession_amount": total.concession_amount,
             "grand_total": total.total_amount,
             "invoice_date": invoice.invoice_date,
-            "customer_name": invoice.customer_name,
+            "customer_name": customer.name if customer else "",
             "customer_email": email,
             "customer_phone": phone,
             "due_date": invoice.due_date,
             "status": invoice.status,
             "currency": invoice.currency,
-            "logo_url": invoice.logo.url if invoice.logo else None,
-            "sign_url": invoice.signature.url if invoice.signature else None,
-            "stamp_url": invoice.stamp.url if invoice.stamp else None,
+            "logo_url": self.images.get_url(invoice, "logo", self.embed_images),
+            "sign_url": self.images.get_url(invoice, "signature", self.embed_images),
+            "stamp_url": self.images.get_url(invoice, "stamp", self.embed_images),
             "custom_columns": custom_columns,
             "additional_fields": additional_fields,
         }
 
         logger.info("Context prepared for invoice: %s", invoice.title)
         return context
+
+    @staticmethod
+    def _get_related(invoice: Any, name: str) -> Any:
+        """Return a one-to-one relation of the invoice, or None if missing."""
+        try:
+            return getattr(invoice, name)
+        except ObjectDoesNotExist:
+            return None
+
+    @staticmethod
+    def _get_contacts(customer: Any) -> Tuple[Optional[str], str]:
+        """Extract the email and phone from the customer's contact field."""
+        contact = {}
+        if customer and customer.contact:
+            contact = customer.contact.get("Contact Info") or {}
+        return contact.get("email"), contact.get("phone", "")
@@ -0,0 +1,56 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import transaction
+
+from sage_invoice.models import Invoice, Item
+
+from .cache import render_cache
+
+logger = logging.getLogger(__name__)
+
+
+class ItemService:
+    """Service class to add line items to invoices in bulk."""
+
+    item_fields = ("description", "quantity", "measurement", "unit_price")
+
+    def bulk_add_items(
+        self,
+        invoice: Invoice,
+        rows: Iterable[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+    ) -> List[Item]:
+        """Add many items to an invoice without saving them one by one.
+
+        Item totals are computed in one pass and the rows inserted with
+        ``bulk_create``; the invoice totals are then recalculated once, when
+        the transaction commits.
+
+        Args:
+            invoice (Invoice): The invoice receiving the items.
+            rows (Iterable[Dict[str, Any]]): One mapping per item with its
+                ``description``, ``quantity``, ``measurement`` and
+                ``unit_price``; other keys are ignored.
+            batch_size (Optional[int]): Items per INSERT; by default the
+                largest batch the database accepts.
+
+        Returns:
+            List[Item]: The created items.
+        """
+        items = [
+            Item(
+                invoice=invoice,
+                **{field: row[field] for field in self.item_fields if field in row},
+            )
+            for row in rows
+        ]
+        if not items:
+            return items
+
+        with transaction.atomic():
+            items = Item.objects.bulk_create(items, batch_size=batch_size)
+        # Bulk inserts send no signals, so nothing else invalidates the render
+        render_cache.invalidate(invoice.pk)
+        logger.info("Added %d items to invoice %s", len(items), invoice.pk)
+        return items
@@ -0,0 +1,164 @@
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from jinja2 import BaseLoader, Environment, TemplateNotFound
+
+from .discovery import template_registry
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSION = ".jinja2"
+
+
+class TemplateIndex:
+    """Process-level index resolving invoice templates without touching disk.
+
+    Built once from the template manifest (see ``TemplateChoiceRegistry``), it
+    maps ``(template id, is_receipt)`` to the loader name of the template and
+    each loader name to its file. A template id is either the full
+    ``template_choice`` value (``"quotation_1"``) or only its number
+    (``"1"``). When several directories provide the same template, the
+    package defaults win, then apps in ``INSTALLED_APPS`` order, as with a
+    ``FileSystemLoader`` search path.
+
+    With ``DEBUG`` enabled a miss rebuilds the index once, so templates added
+    while the development server runs are picked up.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._names: Optional[Dict[Tuple[str, bool], str]] = None
+        self._paths: Dict[str, str] = {}
+
+    def resolve(self, template_id: str, is_receipt: bool = False) -> str:
+        """Return the loader name of a template.
+
+        Args:
+            template_id (str): The ``template_choice`` of an invoice, or the
+                number in it.
+            is_receipt (bool): Whether the invoice is a receipt.
+
+        Returns:
+            str: A template name ready for ``Environment.get_template``.
+
+        Raises:
+            TemplateNotFound: If no directory provides the template.
+        """
+        number = "".join(filter(str.isdigit, template_id))
+        keys = [(template_id, is_receipt), (number, is_receipt)]
+        name = self._lookup(lambda names, _: self._first(names, keys))
+        if name is None:
+            kind = "receipt" if is_receipt else "quotation"
+            raise TemplateNotFound(
+                template_id,
+                f"No {kind} template matches {template_id!r}. Available "
+                f"{kind} templates: {', '.join(self.choices(is_receipt)) or 'none'}.",
+            )
+        return name
+
+    def get_path(self, name: str) -> Optional[str]:
+        """Return the file of the template with loader name ``name``."""
+        return self._lookup(lambda _, paths: paths.get(name))
+
+    def choices(self, is_receipt: bool = False) -> List[str]:
+        names, _ = self._get()
+        return [
+            template_id
+            for (template_id, receipt) in names
+            if receipt == is_receipt and not template_id.isdigit()
+        ]
+
+    def list_templates(self) -> List[str]:
+        return sorted(self._get()[1])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._names = None
+            self._paths = {}
+
+    def _lookup(self, find: Callable) -> Optional[str]:
+        result = find(*self._get())
+        if result is None and settings.DEBUG:
+            self.clear()
+            result = find(*self._get())
+        return result
+
+    def _get(self) -> Tuple[Dict[Tuple[str, bool], str], Dict[str, str]]:
+        with self._lock:
+            if self._names is None:
+                self._names, self._paths = self._build()
+            return self._names, self._paths
+
+    @staticmethod
+    def _first(names: Dict[Tuple[str, bool], str], keys: List) -> Optional[str]:
+        for key in keys:
+            if key in names:
+                return names[key]
+        return None
+
+    @staticmethod
+    def _build() -> Tuple[Dict[Tuple[str, bool], str], Dict[str, str]]:
+        names: Dict[Tuple[str, bool], str] = {}
+        paths: Dict[str, str] = {}
+        for template in template_registry.get_manifest()["templates"]:
+            try:
+                app_path = apps.get_app_config(template["app"]).path
+            except LookupError:
+                logger.warning(
+                    "Skipping template %s of app %s which is not installed",
+                    template["name"],
+                    template["app"],
+                )
+                continue
+
+            loader_name = f"{template['name']}{TEMPLATE_EXTENSION}"
+            paths.setdefault(
+                loader_name,
+                os.path.join(app_path, "templates", template["directory"], loader_name),
+            )
+            names.setdefault((template["name"], template["receipt"]), loader_name)
+            number = "".join(filter(str.isdigit, template["name"]))
+            if number:
+                names.setdefault((number, template["receipt"]), loader_name)
+
+        logger.info("Indexed %d invoice templates", len(paths))
+        return names, paths
+
+
+class TemplateIndexLoader(BaseLoader):
+    """Jinja2 loader reading the files registered in a ``TemplateIndex``."""
+
+    def __init__(self, index: TemplateIndex) -> None:
+        self.index = index
+
+    def get_source(
+        self, environment: Environment, template: str
+    ) -> Tuple[str, str, Callable[[], bool]]:
+        path = self.index.get_path(template)
+        if path is None:
+            raise TemplateNotFound(template)
+
+        try:
+            mtime = os.path.getmtime(path)
+            with open(path, encoding="utf-8") as template_file:
+                source = template_file.read()
+        except OSError as error:
+            raise TemplateNotFound(template) from error
+
+        def uptodate() -> bool:
+            try:
+                return os.path.getmtime(path) == mtime
+            except OSError:
+                return False
+
+        return source, path, uptodate
+
+    def list_templates(self) -> List[str]:
+        return self.index.list_templates()
+
+
+template_index = TemplateIndex()
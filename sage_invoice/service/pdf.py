@@ -0,0 +1,182 @@
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from importlib.util import find_spec
+from multiprocessing import get_context
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from django.utils.text import get_valid_filename
+
+from .invoice_create import QuotationService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PDF_BACKEND = "sage_invoice.service.pdf.WeasyPrintBackend"
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+class PDFBackend:
+    """Base class for engines that turn rendered invoice HTML into PDF bytes.
+
+    Backends are instantiated inside the worker processes, so they must be
+    importable by dotted path and cheap to construct.
+    """
+
+    required_library: Optional[str] = None
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return cls.required_library is None or bool(find_spec(cls.required_library))
+
+    def render(self, html: str, base_url: Optional[str] = None) -> bytes:
+        raise NotImplementedError
+
+
+class WeasyPrintBackend(PDFBackend):
+    """Render PDFs with WeasyPrint (``pip install weasyprint``)."""
+
+    required_library = "weasyprint"
+
+    def render(self, html: str, base_url: Optional[str] = None) -> bytes:
+        try:
+            from weasyprint import HTML
+        except ImportError as err:
+            raise ImproperlyConfigured(
+                "WeasyPrint is required for server-side PDF rendering. "
+                "Install it via pip: pip install weasyprint"
+            ) from err
+        return HTML(string=html, base_url=base_url).write_pdf()
+
+
+def get_backend_path() -> str:
+    return getattr(settings, "SAGE_INVOICE_PDF_BACKEND", DEFAULT_PDF_BACKEND)
+
+
+def get_backend_class() -> type:
+    return import_string(get_backend_path())
+
+
+def is_pdf_available() -> bool:
+    """Return True when the configured backend can render PDFs."""
+    return get_backend_class().is_available()
+
+
+def get_invoice_filename(invoice: Any, extension: str) -> str:
+    """Return the download name of a rendered invoice.
+
+    The title is user-entered, so quotes, path separators and line breaks are
+    dropped to keep the name safe in headers and archives. The id suffix keeps
+    names unique.
+    """
+    title = invoice.title or "Invoice"
+    return get_valid_filename(f"{title}_invoice_{invoice.id}.{extension}")
+
+
+def get_pdf_filename(invoice: Any) -> str:
+    return get_invoice_filename(invoice, "pdf")
+
+
+def render_pdf(backend_path: str, html: str, base_url: Optional[str]) -> bytes:
+    """Convert HTML to PDF with the backend at ``backend_path``.
+
+    This is the entry point run inside the worker processes.
+    """
+    return import_string(backend_path)().render(html, base_url=base_url)
+
+
+def get_pool_size() -> int:
+    return getattr(settings, "SAGE_INVOICE_PDF_WORKERS", os.cpu_count() or 1)
+
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the shared process pool, or None when PDFs render in-process.
+
+    Workers are spawned rather than forked from the (often multi-threaded)
+    web process, and set up Django before importing this module.
+    """
+    global _pool
+    workers = get_pool_size()
+    if not workers:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            logger.info("Starting PDF worker pool with %s processes", workers)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=get_context("spawn"),
+                initializer=django.setup,
+            )
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+class PDFService:
+    """Service class to render invoices to PDF on the server.
+
+    HTML is produced by ``QuotationService`` and converted by the backend named
+    in ``SAGE_INVOICE_PDF_BACKEND`` on a process pool of
+    ``SAGE_INVOICE_PDF_WORKERS`` processes (0 converts in the calling process).
+    Branding images are embedded as data URIs of their renditions unless
+    ``SAGE_INVOICE_PDF_EMBED_IMAGES`` is ``False``.
+    """
+
+    def __init__(self) -> None:
+        self.quotation_service = QuotationService(
+            embed_images=getattr(settings, "SAGE_INVOICE_PDF_EMBED_IMAGES", True)
+        )
+        self.backend_path = get_backend_path()
+        self.base_url = getattr(
+            settings,
+            "SAGE_INVOICE_PDF_BASE_URL",
+            os.path.join(apps.get_app_config("sage_invoice").path, "static"),
+        )
+
+    def render_pdf(self, invoice: Any) -> bytes:
+        """Render a single invoice to PDF bytes."""
+        html = self.quotation_service.render_invoice(invoice)
+        return self.submit(html).result()
+
+    def render_pdfs(self, invoice_ids: Iterable[Any]) -> Iterator[Tuple[Any, bytes]]:
+        """Yield ``(invoice, pdf_bytes)`` pairs in the order of ``invoice_ids``.
+
+        At most twice the pool size conversions are in flight at once, so the
+        memory used by pending documents stays bounded.
+        """
+        max_pending = max(get_pool_size(), 1) * 2
+        pending: deque = deque()
+
+        for invoice, context in self.quotation_service.build_contexts(invoice_ids):
+            html = self.quotation_service.render_invoice(invoice, context)
+            pending.append((invoice, self.submit(html)))
+            if len(pending) >= max_pending:
+                invoice, future = pending.popleft()
+                yield invoice, future.result()
+
+        while pending:
+            invoice, future = pending.popleft()
+            yield invoice, future.result()
+
+    def submit(self, html: str) -> Future:
+        pool = get_pool()
+        if pool is not None:
+            return pool.submit(render_pdf, self.backend_path, html, self.base_url)
+
+        future: Future = Future()
+        future.set_result(render_pdf(self.backend_path, html, self.base_url))
+        return future
@@ -0,0 +1,169 @@
+from decimal import ROUND_HALF_EVEN, ROUND_HALF_UP
+from importlib.util import find_spec
+from itertools import accumulate
+from typing import Any, NamedTuple, Optional, Sequence
+
+# Percentages carry two decimals, so 12.5% is 1250 and 100% is 10000
+PERCENT_SCALE = 10000
+
+
+class QuoteBatch(NamedTuple):
+    """The amounts of every invoice of a batch, in minor units (cents).
+
+    Each field is a NumPy ``int64`` array when NumPy is installed and a list of
+    ints otherwise, with one entry per invoice.
+    """
+
+    subtotal: Any
+    tax_amount: Any
+    discount_amount: Any
+    concession_amount: Any
+    total_amount: Any
+
+
+class BatchQuoteService:
+    """Compute the totals of many hypothetical invoices at once, without the
+    ORM.
+
+    Amounts are integers in minor units and percentages integers in
+    hundredths of a percent, so every step is exact and each amount is
+    rounded once, to the cent, exactly as ``ExpenseService`` values are when
+    the database stores them. SQLite rounds ties to even, PostgreSQL away from
+    zero (``ROUND_HALF_UP``); pass the rounding of your database to match it.
+
+    The lines of all invoices are passed as flat sequences, invoice after
+    invoice, with ``line_counts`` giving the number of lines of each. Uses
+    NumPy when it is installed (``pip install django-sage-invoice[numpy]``)
+    and plain integer arithmetic otherwise; results are the same.
+
+    Amounts are held in ``int64`` with NumPy: subtotals must stay below
+    ``2**63 / PERCENT_SCALE`` cents, far above what ``Expense`` can store.
+    """
+
+    roundings = (ROUND_HALF_EVEN, ROUND_HALF_UP)
+
+    def __init__(
+        self, rounding: str = ROUND_HALF_EVEN, use_numpy: Optional[bool] = None
+    ) -> None:
+        if rounding not in self.roundings:
+            raise ValueError(f"Unsupported rounding {rounding!r}.")
+        self.rounding = rounding
+        self.use_numpy = bool(find_spec("numpy")) if use_numpy is None else use_numpy
+
+    def quote(
+        self,
+        line_counts: Sequence[int],
+        quantities: Sequence[int],
+        unit_prices: Sequence[int],
+        tax_percentages: Sequence[int],
+        discount_percentages: Sequence[int],
+        concession_percentages: Sequence[int],
+    ) -> QuoteBatch:
+        """Return the amounts of each invoice of the batch.
+
+        Args:
+            line_counts (Sequence[int]): The number of lines of each invoice.
+            quantities (Sequence[int]): The quantity of each line; 0 counts as
+                one unit, like an item without a quantity.
+            unit_prices (Sequence[int]): The unit price of each line in minor
+                units.
+            tax_percentages (Sequence[int]): The tax of each invoice in
+                hundredths of a percent.
+            discount_percentages (Sequence[int]): The discount of each invoice
+                in hundredths of a percent.
+            concession_percentages (Sequence[int]): The concession of each
+                invoice in hundredths of a percent.
+
+        Returns:
+            QuoteBatch: The subtotal, tax, discount, concession and total of
+            each invoice in minor units.
+
+        Raises:
+            ValueError: If the sequences do not have matching lengths.
+        """
+        invoices = len(line_counts)
+        if not (
+            len(tax_percentages)
+            == len(discount_percentages)
+            == len(concession_percentages)
+            == invoices
+        ):
+            raise ValueError("Every invoice needs one value of each percentage.")
+        if len(quantities) != len(unit_prices):
+            raise ValueError("Every line needs a quantity and a unit price.")
+        if sum(line_counts) != len(quantities):
+            raise ValueError("line_counts must add up to the number of lines.")
+
+        quote = self._quote_numpy if self.use_numpy else self._quote_python
+        return quote(
+            line_counts,
+            quantities,
+            unit_prices,
+            tax_percentages,
+            discount_percentages,
+            concession_percentages,
+        )
+
+    def _quote_numpy(self, line_counts, quantities, unit_prices, *percentages):
+        import numpy as np
+
+        quantities = np.asarray(quantities, dtype=np.int64)
+        line_totals = np.where(quantities == 0, 1, quantities) * np.asarray(
+            unit_prices, dtype=np.int64
+        )
+        # Sums of consecutive segments, empty invoices included
+        line_counts = np.asarray(line_counts, dtype=np.int64)
+        ends = np.cumsum(line_counts)
+        running = np.concatenate(([0], np.cumsum(line_totals)))
+        subtotal = running[ends] - running[ends - line_counts]
+
+        tax, discount, concession = (
+            np.asarray(percentage, dtype=np.int64) for percentage in percentages
+        )
+        return self._amounts(subtotal, tax, discount, concession)
+
+    def _quote_python(self, line_counts, quantities, unit_prices, *percentages):
+        line_totals = [
+            (quantity or 1) * unit_price
+            for quantity, unit_price in zip(quantities, unit_prices)
+        ]
+        running = [0, *accumulate(line_totals)]
+        ends = list(accumulate(line_counts))
+        subtotals = [
+            running[end] - running[end - count] for end, count in zip(ends, line_counts)
+        ]
+        amounts = [self._amounts(*invoice) for invoice in zip(subtotals, *percentages)]
+        if not amounts:
+            return QuoteBatch([], [], [], [], [])
+        return QuoteBatch(*(list(column) for column in zip(*amounts)))
+
+    def _amounts(self, subtotal, tax, discount, concession) -> QuoteBatch:
+        """Work on ints and on NumPy arrays alike."""
+        return QuoteBatch(
+            subtotal,
+            self._share(subtotal, tax),
+            self._share(subtotal, discount),
+            self._share(subtotal, concession),
+            # The total is rounded once from the exact shares, not summed from
+            # the rounded ones
+            self._divide(
+                subtotal * (PERCENT_SCALE + tax - discount - concession),
+                PERCENT_SCALE,
+            ),
+        )
+
+    def _share(self, subtotal, percentage):
+        return self._divide(subtotal * percentage, PERCENT_SCALE)
+
+    def _divide(self, numerator, denominator: int):
+        """Divide and round to the nearest integer, ties by ``rounding``."""
+        negative = numerator < 0
+        quotient, remainder = divmod(abs(numerator), denominator)
+        up = 2 * remainder > denominator
+        tie = 2 * remainder == denominator
+        if self.rounding == ROUND_HALF_EVEN:
+            up = up | (tie & (quotient % 2 == 1))
+        else:
+            up = up | tie
+        rounded = quotient + up
+        return rounded - 2 * rounded * negative
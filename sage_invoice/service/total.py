@@ -1,18 +1,155 @@
+import logging
+from collections import defaultdict
 from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from sage_invoice.models import Expense, Invoice, Item
+
+logger = logging.getLogger(__name__)
 
 
 class ExpenseService:
-    """Service class to handle calculations and saving for Expense."""
+    """Service class to handle calculations and saving for Expense.
+
+    Subtotals are summed by the database, so items are never loaded into
+    Python. The percentage arithmetic then runs on that single Decimal exactly
+    as before, which keeps the rounding identical on every database backend.
+    """
+
+    amount_fields = (
+        "subtotal",
+        "tax_amount",
+        "discount_amount",
+        "concession_amount",
+        "total_amount",
+    )
+    # Wider than the item columns so sums of large invoices never overflow
+    subtotal_field = models.DecimalField(max_digits=20, decimal_places=2)
 
     def calculate_and_save(self, invoice_total, *args, **kwargs):
         """Calculate the subtotal, tax amount, discount amount, and total
         amount, and then save the instance.
         """
-        # Calculate subtotal from related items, ensure it's not None
-        invoice_total.subtotal = sum(
-            item.total_price for item in invoice_total.invoice.items.all()
+        subtotals = self.get_subtotals([invoice_total.invoice_id])
+        self.apply_totals(
+            invoice_total, subtotals.get(invoice_total.invoice_id, Decimal(0))
         )
 
+        # Save the Expense instance using the standard save method
+        invoice_total.save(*args, **kwargs)
+
+    def calculate(
+        self,
+        invoice_ids: Iterable[Any],
+        create_missing: bool = False,
+        using: str = DEFAULT_DB_ALIAS,
+    ) -> List[Expense]:
+        """Return the expenses of many invoices with recalculated amounts,
+        without saving them.
+
+        Args:
+            invoice_ids (Iterable[Any]): The invoices to calculate.
+            create_missing (bool): Add an unsaved expense for invoices that
+                have none; they are skipped otherwise.
+            using (str): The database to read from.
+
+        Returns:
+            List[Expense]: The expenses, in the order of ``invoice_ids``.
+        """
+        invoice_ids = list(invoice_ids)
+        existing = {
+            expense.invoice_id: expense
+            for expense in Expense.objects.using(using).filter(
+                invoice_id__in=invoice_ids
+            )
+        }
+        subtotals = self.get_subtotals(invoice_ids, using)
+
+        expenses = []
+        for invoice_id in invoice_ids:
+            expense = existing.get(invoice_id)
+            if expense is None:
+                if not create_missing:
+                    continue
+                expense = Expense(invoice_id=invoice_id)
+            self.apply_totals(expense, subtotals.get(invoice_id, Decimal(0)))
+            expenses.append(expense)
+        return expenses
+
+    def recalculate(
+        self,
+        invoice_ids: Iterable[Any],
+        create_missing: bool = False,
+        using: str = DEFAULT_DB_ALIAS,
+    ) -> List[Expense]:
+        """Recalculate and save the expenses of many invoices in three
+        queries, plus one to create missing expenses if asked to.
+
+        Args:
+            invoice_ids (Iterable[Any]): The invoices to recalculate.
+            create_missing (bool): Create the expense of invoices that have
+                none.
+            using (str): The database to read from and write to.
+
+        Returns:
+            List[Expense]: The updated expenses.
+        """
+        invoice_ids = list(invoice_ids)
+        expenses = self.calculate(invoice_ids, create_missing, using)
+        Expense.objects.using(using).bulk_update(
+            [expense for expense in expenses if expense.pk], self.amount_fields
+        )
+        # Another transaction may have created the expense since it was read
+        Expense.objects.using(using).bulk_create(
+            [expense for expense in expenses if expense.pk is None],
+            ignore_conflicts=True,
+        )
+        self.sync_invoices(invoice_ids, using)
+        return expenses
+
+    def sync_invoices(
+        self, invoice_ids: Iterable[Any], using: str = DEFAULT_DB_ALIAS
+    ) -> int:
+        """Copy the grand total and item count onto the invoices in one
+        UPDATE, so listings can sort and filter on them without joins.
+        """
+        item_counts = (
+            Item.objects.filter(invoice=OuterRef("pk"))
+            .order_by()
+            .values("invoice")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        return (
+            Invoice.objects.using(using)
+            .filter(pk__in=invoice_ids)
+            .update(
+                grand_total=Coalesce(get_grand_total(), Value(Decimal(0))),
+                item_count=Coalesce(Subquery(item_counts), 0),
+            )
+        )
+
+    def get_subtotals(
+        self, invoice_ids: Iterable[Any], using: str = DEFAULT_DB_ALIAS
+    ) -> Dict[Any, Decimal]:
+        """Return the sum of the item totals of each invoice that has items."""
+        rows = (
+            Item.objects.using(using)
+            .filter(invoice_id__in=invoice_ids)
+            .values("invoice_id")
+            .annotate(subtotal=Sum("total_price", output_field=self.subtotal_field))
+            .order_by()
+        )
+        return {row["invoice_id"]: row["subtotal"] for row in rows}
+
+    def apply_totals(self, invoice_total, subtotal: Decimal) -> None:
+        """Set the amounts of ``invoice_total`` from its items' ``subtotal``."""
+        invoice_total.subtotal = subtotal
+
         # Convert tax and discount percentages to Decimal
         tax_percentage = Decimal(invoice_total.tax_percentage)
         discount_percentage = Decimal(invoice_total.discount_percentage)
@@ -37,5 +174,162 @@ class ExpenseService:
             - invoice_total.concession_amount
         )
 
-        # Save the Expense instance using the standard save method
-        invoice_total.save(*args, **kwargs)
+
+def get_grand_total() -> Subquery:
+    """The total amount of the expense of the outer invoice."""
+    return Subquery(
+        Expense.objects.filter(invoice=OuterRef("pk")).values("total_amount")[:1]
+    )
+
+
+class PendingRecalculation:
+    """The invoices whose totals are recalculated when a transaction commits.
+
+    Registered once per transaction with ``transaction.on_commit``; every
+    later request in the same transaction only adds its invoice id, so the
+    totals are computed once, in one batch, whatever the number of saves.
+    """
+
+    # Large imports queue many invoices; keep each IN clause bounded
+    chunk_size = 500
+
+    def __init__(self, using: str) -> None:
+        self.using = using
+        self.invoice_ids: Set[Any] = set()
+
+    def __call__(self) -> None:
+        pending = list(self.invoice_ids)
+        with transaction.atomic(using=self.using):
+            for start in range(0, len(pending), self.chunk_size):
+                # Invoices deleted later in the transaction have nothing to update
+                invoice_ids = list(
+                    Invoice.objects.using(self.using)
+                    .filter(pk__in=pending[start : start + self.chunk_size])
+                    .values_list("pk", flat=True)
+                )
+                logger.debug("Recalculating totals of invoices %s", invoice_ids)
+                ExpenseService().recalculate(
+                    invoice_ids, create_missing=True, using=self.using
+                )
+
+
+def get_pending_recalculation(
+    using: str = DEFAULT_DB_ALIAS,
+) -> Optional[PendingRecalculation]:
+    """Return the batch waiting for the current transaction to commit."""
+    connection = transaction.get_connection(using)
+    pending = getattr(connection, "sage_invoice_recalculation", None)
+    # A rollback drops the callback of the pending batch
+    if pending is not None and any(
+        func is pending for _, func, _ in connection.run_on_commit
+    ):
+        return pending
+    return None
+
+
+def schedule_recalculation(invoice_id: Any, using: str = DEFAULT_DB_ALIAS) -> None:
+    """Recalculate the totals of an invoice when the current transaction
+    commits, or right away in autocommit mode.
+    """
+    pending = get_pending_recalculation(using)
+    if pending is None:
+        pending = PendingRecalculation(using)
+        transaction.get_connection(using).sage_invoice_recalculation = pending
+        pending.invoice_ids.add(invoice_id)
+        transaction.on_commit(pending, using=using)
+    else:
+        pending.invoice_ids.add(invoice_id)
+
+
+def apply_subtotal_delta(
+    invoice_id: Any,
+    delta: Decimal,
+    count_delta: int = 0,
+    using: str = DEFAULT_DB_ALIAS,
+) -> bool:
+    """Shift the subtotal of an invoice by ``delta`` and derive its amounts
+    in a single UPDATE, without summing the items again, then copy the new
+    total and item count onto the invoice.
+
+    Returns:
+        bool: False if the invoice has no expense to update.
+    """
+    subtotal = F("subtotal") + Value(delta, output_field=ExpenseService.subtotal_field)
+
+    def share(percentage_field: str):
+        return subtotal * F(percentage_field) / Value(Decimal(100))
+
+    with transaction.atomic(using=using):
+        updated = (
+            Expense.objects.using(using)
+            .filter(invoice_id=invoice_id)
+            .update(
+                subtotal=subtotal,
+                tax_amount=share("tax_percentage"),
+                discount_amount=share("discount_percentage"),
+                concession_amount=share("concession_percentage"),
+                total_amount=subtotal
+                + share("tax_percentage")
+                - share("discount_percentage")
+                - share("concession_percentage"),
+            )
+        )
+        if updated:
+            Invoice.objects.using(using).filter(pk=invoice_id).update(
+                grand_total=get_grand_total(),
+                item_count=F("item_count") + count_delta,
+            )
+    return bool(updated)
+
+
+def get_item_deltas(
+    item: Item, created: bool = False, deleted: bool = False
+) -> Optional[Dict[Any, Tuple[Decimal, int]]]:
+    """Return how much a saved or deleted item changes the subtotal and item
+    count of each invoice, or None when the item's stored total is unknown.
+    """
+    if created:
+        return {item.invoice_id: (item.total_price or Decimal(0), 1)}
+
+    loaded = getattr(item, "_loaded_values", None)
+    if loaded is None:
+        return None
+    old_invoice_id, old_total = loaded
+
+    amounts: Dict[Any, Decimal] = defaultdict(Decimal)
+    counts: Dict[Any, int] = defaultdict(int)
+    amounts[old_invoice_id] -= old_total or Decimal(0)
+    counts[old_invoice_id] -= 1
+    if not deleted:
+        amounts[item.invoice_id] += item.total_price or Decimal(0)
+        counts[item.invoice_id] += 1
+    return {
+        invoice_id: (amount, counts[invoice_id])
+        for invoice_id, amount in amounts.items()
+    }
+
+
+def update_totals_for_item(
+    item: Item,
+    created: bool = False,
+    deleted: bool = False,
+    using: str = DEFAULT_DB_ALIAS,
+) -> None:
+    """Keep the totals of an item's invoice current after it changed.
+
+    Invoices already waiting for a batch recalculation are left to it;
+    otherwise the subtotal difference is applied with one UPDATE.
+    """
+    deltas = get_item_deltas(item, created, deleted)
+    if deltas is None:
+        schedule_recalculation(item.invoice_id, using)
+        return
+
+    pending = get_pending_recalculation(using)
+    for invoice_id, (delta, count_delta) in deltas.items():
+        if pending is not None and invoice_id in pending.invoice_ids:
+            continue
+        if not (delta or count_delta):
+            continue
+        if not apply_subtotal_delta(invoice_id, delta, count_delta, using):
+            schedule_recalculation(invoice_id, using)
@@ -1,25 +1,28 @@
 import logging
 
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError, OperationalError, transaction
-from django.db.models.signals import post_save
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, OperationalError
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from sage_invoice.service.total import ExpenseService
+from sage_invoice.service.cache import render_cache
+from sage_invoice.service.images import ImageRenditionService
+from sage_invoice.service.total import (
+    ExpenseService,
+    schedule_recalculation,
+    update_totals_for_item,
+)
 
-from .models import Expense, Invoice
+from .models import Column, CustomerProfile, Expense, Invoice, Item
 
 logger = logging.getLogger()
 
 
 @receiver(post_save, sender=Invoice)
 def update_invoice_total_on_save(sender, instance, created, **kwargs):
-    def recalculate_total():
-        invoice_total, _ = Expense.objects.get_or_create(invoice=instance)
-        ExpenseService().calculate_and_save(invoice_total)
-
     try:
-        transaction.on_commit(recalculate_total)
+        using = kwargs.get("using", DEFAULT_DB_ALIAS)
+        schedule_recalculation(instance.pk, using=using)
     except IntegrityError as error:
         logger.error(
             "Integrity error occurred for invoice %s: %s", instance.title, error
@@ -34,3 +37,45 @@ def update_invoice_total_on_save(sender, instance, created, **kwargs):
         logger.exception(
             "Unexpected error occurred for invoice %s: %s", instance.title, error
         )
+
+
+@receiver(post_save, sender=Item)
+def update_invoice_total_on_item_save(sender, instance, created, **kwargs):
+    update_totals_for_item(instance, created=created, using=kwargs["using"])
+
+
+@receiver(post_delete, sender=Item)
+def update_invoice_total_on_item_delete(sender, instance, **kwargs):
+    update_totals_for_item(instance, deleted=True, using=kwargs["using"])
+
+
+@receiver(pre_save, sender=Expense)
+def update_expense_amounts(sender, instance, **kwargs):
+    # Percentage changes only need the stored subtotal, not the items
+    ExpenseService().apply_totals(instance, instance.subtotal)
+
+
+@receiver(post_save, sender=Expense)
+def update_invoice_grand_total(sender, instance, **kwargs):
+    ExpenseService().sync_invoices([instance.invoice_id], using=kwargs["using"])
+
+
+@receiver([post_save, post_delete], sender=Invoice)
+@receiver([post_save, post_delete], sender=Item)
+@receiver([post_save, post_delete], sender=Column)
+@receiver([post_save, post_delete], sender=Expense)
+@receiver([post_save, post_delete], sender=CustomerProfile)
+def invalidate_rendered_invoice(sender, instance, **kwargs):
+    invoice_id = instance.pk if sender is Invoice else instance.invoice_id
+    render_cache.invalidate(invoice_id)
+
+
+@receiver(pre_save, sender=Invoice)
+def track_image_uploads(sender, instance, **kwargs):
+    instance._image_uploads = ImageRenditionService().get_uploads(instance)
+
+
+@receiver(post_save, sender=Invoice)
+def create_image_renditions(sender, instance, **kwargs):
+    uploads = getattr(instance, "_image_uploads", ())
+    ImageRenditionService().process(instance, uploads)
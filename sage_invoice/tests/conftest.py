@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def sage_settings(settings):
+    """Provide the settings required by template discovery to every test."""
+    settings.SAGE_MODEL_PREFIX = "invoice"
+    settings.SAGE_MODEL_TEMPLATE = "sage_invoice"
+    return settings
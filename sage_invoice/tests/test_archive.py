@@ -0,0 +1,121 @@
+import io
+import zipfile
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+
+from sage_invoice.admin.actions import export_pdf
+from sage_invoice.models import Expense, Invoice, Item
+from sage_invoice.service.archive import stream_zip
+from sage_invoice.views.invoice import DownloadInvoicesArchiveView
+
+
+class TestStreamZip:
+
+    def test_entries_are_yielded_incrementally(self):
+        entries = ((f"invoice_{index}.html", b"x" * 1000) for index in range(3))
+
+        chunks = list(stream_zip(entries))
+
+        # One chunk per entry plus the central directory
+        assert len(chunks) == 4
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+        assert archive.testzip() is None
+        assert archive.namelist() == [
+            "invoice_0.html",
+            "invoice_1.html",
+            "invoice_2.html",
+        ]
+        assert archive.read("invoice_1.html") == b"x" * 1000
+
+    def test_entries_are_consumed_lazily(self):
+        produced = []
+
+        def entries():
+            for index in range(3):
+                produced.append(index)
+                yield f"invoice_{index}.html", b"content"
+
+        stream = stream_zip(entries())
+        next(stream)
+
+        assert produced == [0]
+
+
+@pytest.mark.django_db
+class TestDownloadInvoicesArchiveView:
+
+    @pytest.fixture(autouse=True)
+    def urls(self, settings):
+        settings.ROOT_URLCONF = "sage_invoice.urls"
+        settings.SAGE_INVOICE_PDF_BACKEND = "sage_invoice.tests.test_pdf.FakeBackend"
+        settings.SAGE_INVOICE_PDF_WORKERS = 0
+
+    @pytest.fixture
+    def invoices(self, db):
+        invoices = []
+        for index in range(3):
+            invoice = Invoice.objects.create(
+                title=f"Archive Invoice {index}",
+                invoice_date="2024-09-10",
+                tracking_code=f"INV-{index}",
+                status="unpaid",
+                due_date="2024-10-10",
+                template_choice="quotation_1",
+            )
+            Expense.objects.create(invoice=invoice)
+            Item.objects.create(
+                invoice=invoice,
+                description="Item",
+                quantity=1,
+                unit_price=Decimal("10.00"),
+            )
+            invoices.append(invoice)
+        return invoices
+
+    def get(self, query):
+        request = RequestFactory().get("/download-invoices/archive/", query)
+        request.user = User(username="staff", is_staff=True)
+        return DownloadInvoicesArchiveView.as_view()(request)
+
+    @pytest.mark.parametrize("file_format", ["pdf", "html"])
+    def test_archive(self, invoices, file_format):
+        ids = ",".join(str(invoice.id) for invoice in invoices)
+
+        response = self.get({"invoice_ids": ids, "format": file_format})
+
+        assert response["Content-Type"] == "application/zip"
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        assert archive.namelist() == [
+            f"Archive_Invoice_{index}_invoice_{invoice.id}.{file_format}"
+            for index, invoice in enumerate(invoices)
+        ]
+
+    @pytest.mark.parametrize("file_format", ["pdf", "html"])
+    def test_entry_names_stay_inside_archive(self, invoices, file_format):
+        Invoice.objects.filter(pk=invoices[0].pk).update(title="../../etc/x")
+        Invoice.objects.filter(pk=invoices[1].pk).update(title="Q3/Acme")
+        ids = ",".join(str(invoice.id) for invoice in invoices[:2])
+
+        response = self.get({"invoice_ids": ids, "format": file_format})
+
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        assert archive.namelist() == [
+            f"....etcx_invoice_{invoices[0].id}.{file_format}",
+            f"Q3Acme_invoice_{invoices[1].id}.{file_format}",
+        ]
+
+    def test_unsupported_format(self, invoices):
+        response = self.get({"invoice_ids": str(invoices[0].id), "format": "docx"})
+        assert response.status_code == 400
+
+    def test_export_action_streams_large_selections(self, invoices, settings):
+        settings.SAGE_INVOICE_ARCHIVE_THRESHOLD = 2
+
+        response = export_pdf(None, RequestFactory().get("/"), Invoice.objects.all())
+
+        assert response["Content-Type"] == "application/zip"
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        assert len(archive.namelist()) == len(invoices)
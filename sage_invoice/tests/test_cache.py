@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+
+from sage_invoice.models import Expense, Invoice, Item
+from sage_invoice.service.cache import render_cache
+from sage_invoice.service.invoice_create import QuotationService
+
+
+@pytest.mark.django_db
+class TestRenderCache:
+
+    @pytest.fixture(autouse=True)
+    def clean_cache(self, settings):
+        settings.CACHES = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        }
+        cache.clear()
+        render_cache.reset_stats()
+        yield
+        cache.clear()
+
+    @pytest.fixture
+    def invoice(self, db):
+        invoice = Invoice.objects.create(
+            title="Cached Invoice",
+            invoice_date="2024-09-10",
+            tracking_code="INV-1",
+            status="unpaid",
+            due_date="2024-10-10",
+            template_choice="quotation_1",
+        )
+        Expense.objects.create(invoice=invoice)
+        Item.objects.create(
+            invoice=invoice,
+            description="Original item",
+            quantity=1,
+            unit_price=Decimal("10.00"),
+        )
+        return invoice
+
+    def render(self, invoice):
+        service = QuotationService()
+        [(invoice, context)] = list(service.build_contexts([invoice.pk]))
+        return service.render_invoice(invoice, context)
+
+    def test_second_render_is_a_hit(self, invoice):
+        first = self.render(invoice)
+        second = self.render(invoice)
+
+        assert first == second
+        assert render_cache.stats() == {"hits": 1, "misses": 1}
+
+    def test_item_save_invalidates_entry(self, invoice):
+        self.render(invoice)
+        item = invoice.items.get()
+        item.description = "Changed item"
+        item.save()
+
+        assert cache.get(render_cache.make_key(invoice.pk)) is None
+        assert "Changed item" in self.render(invoice)
+        assert render_cache.stats() == {"hits": 0, "misses": 2}
+
+    def test_item_delete_invalidates_entry(self, invoice):
+        self.render(invoice)
+        invoice.items.get().delete()
+
+        assert cache.get(render_cache.make_key(invoice.pk)) is None
+
+    def test_fingerprint_catches_changes_without_signals(self, invoice):
+        self.render(invoice)
+        Item.objects.filter(invoice=invoice).update(description="Bulk update")
+
+        assert "Bulk update" in self.render(invoice)
+        assert render_cache.stats() == {"hits": 0, "misses": 2}
+
+    def test_cache_can_be_disabled(self, invoice, settings):
+        settings.SAGE_INVOICE_RENDER_CACHE = None
+
+        self.render(invoice)
+        self.render(invoice)
+
+        assert render_cache.stats() == {"hits": 0, "misses": 0}
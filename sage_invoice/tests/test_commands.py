@@ -0,0 +1,264 @@
+import gzip
+import json
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from sage_invoice.management.commands.recalculate_invoice_totals import split_range
+from sage_invoice.models import Category, CustomerProfile, Expense, Invoice, Item
+from sage_invoice.service.environment import clear_environments
+from sage_invoice.service.invoice_create import QuotationService
+from sage_invoice.service.loader import TemplateIndexLoader
+from sage_invoice.service.total import ExpenseService
+
+
+class TestCompileInvoiceTemplates:
+
+    @pytest.fixture(autouse=True)
+    def fresh_registry(self):
+        clear_environments()
+        yield
+        clear_environments()
+
+    def test_compiles_discovered_templates(self, tmp_path):
+        out = StringIO()
+
+        call_command("compile_invoice_templates", target=str(tmp_path), stdout=out)
+
+        modules = [path for path in tmp_path.iterdir() if path.suffix == ".py"]
+        assert len(modules) == 7
+        assert "Compiled 7 templates" in out.getvalue()
+
+    def test_requires_target(self, settings):
+        settings.SAGE_INVOICE_COMPILED_TEMPLATES_DIR = None
+
+        with pytest.raises(CommandError):
+            call_command("compile_invoice_templates")
+
+    def test_service_loads_precompiled_templates(self, tmp_path, settings):
+        settings.SAGE_INVOICE_COMPILED_TEMPLATES_DIR = str(tmp_path)
+        call_command("compile_invoice_templates", stdout=StringIO())
+
+        env = QuotationService().env
+        with mock.patch.object(
+            TemplateIndexLoader, "get_source", side_effect=AssertionError
+        ):
+            template = env.get_template("quotation_1.jinja2")
+
+        assert "Compiled Title" in template.render(title="Compiled Title")
+
+
+class TestBuildInvoiceManifest:
+
+    def test_writes_manifest(self, tmp_path):
+        output = tmp_path / "manifest.json"
+        out = StringIO()
+
+        call_command("build_invoice_manifest", output=str(output), stdout=out)
+
+        manifest = json.loads(output.read_text())
+        assert len(manifest["templates"]) == 7
+        assert "Wrote 7 templates" in out.getvalue()
+
+    def test_unchanged_manifest_is_not_rewritten(self, tmp_path):
+        output = tmp_path / "manifest.json"
+        call_command("build_invoice_manifest", output=str(output), stdout=StringIO())
+        out = StringIO()
+
+        call_command("build_invoice_manifest", output=str(output), stdout=out)
+
+        assert "is up to date" in out.getvalue()
+
+    def test_requires_output(self, settings):
+        settings.SAGE_INVOICE_TEMPLATE_MANIFEST = None
+
+        with pytest.raises(CommandError):
+            call_command("build_invoice_manifest")
+
+
+@pytest.mark.django_db
+class TestRecalculateInvoiceTotals:
+
+    @pytest.fixture
+    def category(self):
+        return Category.objects.create(title="Services", slug="services")
+
+    @pytest.fixture
+    def invoices(self, category):
+        invoices = []
+        for index, (status, invoice_date) in enumerate(
+            [
+                ("paid", "2024-01-10"),
+                ("unpaid", "2024-02-10"),
+                ("unpaid", "2024-03-10"),
+            ]
+        ):
+            invoice = Invoice.objects.create(
+                title=f"Invoice {index}",
+                invoice_date=invoice_date,
+                tracking_code=f"INV-{index}",
+                status=status,
+                due_date="2024-12-31",
+                template_choice="quotation_1",
+                category=category if index else None,
+            )
+            Item.objects.create(
+                invoice=invoice,
+                description="Item",
+                quantity=2,
+                unit_price=Decimal("50.00"),
+            )
+            invoices.append(invoice)
+        # Stale totals, as left behind by a tax rule change
+        Expense.objects.bulk_create(
+            [
+                Expense(invoice=invoice, tax_percentage=Decimal("10.00"))
+                for invoice in invoices[:2]
+            ]
+        )
+        return invoices
+
+    def totals(self):
+        return dict(Expense.objects.values_list("invoice_id", "total_amount"))
+
+    def test_recalculates_every_invoice(self, invoices):
+        out = StringIO()
+
+        call_command("recalculate_invoice_totals", chunk_size=2, stdout=out)
+
+        assert self.totals() == {
+            invoices[0].pk: Decimal("110.00"),
+            invoices[1].pk: Decimal("110.00"),
+            invoices[2].pk: Decimal("100.00"),
+        }
+        assert "Recalculated totals of 3 invoices" in out.getvalue()
+
+    def test_filters(self, invoices):
+        call_command(
+            "recalculate_invoice_totals",
+            category=["services"],
+            status=["unpaid"],
+            from_date="2024-02-01",
+            to_date="2024-02-28",
+            stdout=StringIO(),
+        )
+
+        assert self.totals() == {
+            invoices[0].pk: Decimal("0.00"),
+            invoices[1].pk: Decimal("110.00"),
+        }
+
+    def test_dry_run_reports_diffs(self, invoices):
+        out = StringIO()
+
+        call_command("recalculate_invoice_totals", dry_run=True, stdout=out)
+
+        output = out.getvalue()
+        assert f"Invoice {invoices[0].pk}: total_amount 0.00 -> 110.00" in output
+        assert f"Invoice {invoices[2].pk}: subtotal None -> 100.00" in output
+        assert "Dry run: 3 of 3 invoices would change" in output
+        assert set(self.totals().values()) == {Decimal("0.00")}
+
+    def test_queries_per_chunk(self, invoices, django_assert_num_queries):
+        Expense.objects.create(invoice=invoices[2])
+
+        # Bounds, then per chunk: ids, expenses, aggregate, bulk update, invoice
+        # sync and the savepoint pair of its transaction, then the final empty
+        # page
+        with django_assert_num_queries(1 + 2 * (5 + 2) + 1):
+            call_command("recalculate_invoice_totals", chunk_size=2, stdout=StringIO())
+
+    def test_split_range(self):
+        assert split_range(1, 10, 3) == [(1, 4), (5, 8), (9, 10)]
+        assert split_range(5, 5, 4) == [(5, 5)]
+
+
+@pytest.mark.django_db
+class TestVerifyInvoiceTotals:
+
+    @pytest.fixture
+    def invoice(self):
+        invoice = Invoice.objects.create(
+            title="Verified Invoice",
+            invoice_date="2024-01-10",
+            tracking_code="INV-V",
+            status="unpaid",
+            due_date="2024-12-31",
+            template_choice="quotation_1",
+        )
+        Item.objects.create(
+            invoice=invoice, description="Item", quantity=2, unit_price=25
+        )
+        ExpenseService().recalculate([invoice.pk], create_missing=True)
+        return invoice
+
+    def test_consistent_totals(self, invoice):
+        out = StringIO()
+
+        call_command("verify_invoice_totals", stdout=out)
+
+        assert "Totals of all 1 invoices are consistent" in out.getvalue()
+
+    def test_reports_drift(self, invoice):
+        Expense.objects.filter(invoice=invoice).update(subtotal=Decimal("1.00"))
+        out = StringIO()
+
+        with pytest.raises(CommandError, match="1 of 1 invoices drifted"):
+            call_command("verify_invoice_totals", stdout=out)
+
+        assert f"Invoice {invoice.pk}: subtotal 1.00 != 50.00" in out.getvalue()
+
+    def test_fixes_drift(self, invoice):
+        Expense.objects.filter(invoice=invoice).update(total_amount=Decimal("1.00"))
+
+        call_command("verify_invoice_totals", fix=True, stdout=StringIO())
+
+        assert Expense.objects.get(invoice=invoice).total_amount == Decimal("50.00")
+
+
+@pytest.mark.django_db
+class TestExportInvoices:
+
+    @pytest.fixture
+    def invoices(self):
+        invoices = []
+        for index, status in enumerate(["paid", "unpaid"]):
+            invoice = Invoice.objects.create(
+                title=f"Exported Invoice {index}",
+                invoice_date="2024-09-10",
+                tracking_code=f"INV-X{index}",
+                status=status,
+                due_date="2024-10-10",
+                template_choice="quotation_1",
+            )
+            CustomerProfile.objects.create(invoice=invoice, name="Jane Doe")
+            invoices.append(invoice)
+        return invoices
+
+    @pytest.mark.parametrize("compress", [False, True])
+    def test_writes_jsonl(self, invoices, tmp_path, compress):
+        path = tmp_path / "invoices.jsonl"
+        out = StringIO()
+
+        call_command(
+            "export_invoices",
+            str(path),
+            format="jsonl",
+            gzip=compress,
+            status=["paid"],
+            stdout=out,
+        )
+
+        data = path.read_bytes()
+        if compress:
+            data = gzip.decompress(data)
+        rows = [json.loads(line) for line in data.decode().splitlines()]
+        assert [row["title"] for row in rows] == ["Exported Invoice 0"]
+        assert f"Exported 1 invoices to {path}." in out.getvalue()
+
+    def test_invalid_chunk_size(self, tmp_path):
+        with pytest.raises(CommandError):
+            call_command("export_invoices", str(tmp_path / "out.csv"), chunk_size=0)
@@ -0,0 +1,88 @@
+import tracemalloc
+from decimal import Decimal
+
+from sage_invoice.service.context import EMPTY_CUSTOM_DATA, LineItem, build_line_items
+
+ITEM_COUNT = 10_000
+
+
+def synthetic_rows():
+    item_rows = [
+        (
+            item_id,
+            1,
+            f"Item {item_id}",
+            item_id % 7 + 1,
+            None,
+            Decimal("12.50"),
+            Decimal("12.50") * (item_id % 7 + 1),
+        )
+        for item_id in range(ITEM_COUNT)
+    ]
+    # Every tenth line carries custom columns
+    column_rows = [
+        (item_id, column_name, "value")
+        for item_id in range(0, ITEM_COUNT, 10)
+        for column_name in ("Color", "Size")
+    ]
+    return item_rows, column_rows
+
+
+def build_item_dicts(item_rows, column_rows):
+    """The per-item dict representation used before LineItem."""
+    custom_data = {}
+    for item_id, column_name, value in column_rows:
+        custom_data.setdefault(item_id, {})[column_name] = value
+    return [
+        {
+            "description": description,
+            "quantity": quantity,
+            "measurement": measurement if measurement else "",
+            "unit_price": unit_price,
+            "total_price": total_price,
+            "custom_data": dict(custom_data.get(item_id, {})),
+        }
+        for item_id, _, description, quantity, measurement, unit_price, total_price in item_rows
+    ]
+
+
+def allocated(builder, *args):
+    """Return the bytes still allocated by the object ``builder`` returns."""
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = builder(*args)
+        size = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    assert result
+    return size
+
+
+class TestLineItems:
+
+    def test_build_line_items(self):
+        item_rows, column_rows = synthetic_rows()
+
+        line_items = build_line_items(item_rows[:11], column_rows[:4])[1]
+
+        assert line_items[0] == LineItem(
+            "Item 0",
+            1,
+            "",
+            Decimal("12.50"),
+            Decimal("12.50"),
+            {"Color": "value", "Size": "value"},
+        )
+        assert line_items[1].custom_data is EMPTY_CUSTOM_DATA
+        assert line_items[10].custom_data == {"Color": "value", "Size": "value"}
+
+    def test_memory_of_10k_item_invoice(self):
+        item_rows, column_rows = synthetic_rows()
+
+        dict_bytes = allocated(build_item_dicts, item_rows, column_rows)
+        tuple_bytes = allocated(build_line_items, item_rows, column_rows)
+
+        # A LineItem and its list slot take about 120 bytes on CPython 3.9+
+        assert tuple_bytes / ITEM_COUNT < 160
+        assert tuple_bytes < dict_bytes * 0.6
@@ -0,0 +1,222 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+
+from sage_invoice.helpers.funcs import get_template_choices
+from sage_invoice.service.discovery import (
+    JinjaTemplateDiscovery,
+    template_registry,
+    write_manifest,
+)
+
+APP_COUNT = 100
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    template_registry.clear()
+    yield
+    template_registry.clear()
+
+
+@pytest.fixture
+def installed_apps(tmp_path):
+    """Install ``APP_COUNT`` fake apps, each shipping two custom templates."""
+    app_configs = [apps.get_app_config("sage_invoice")]
+    for index in range(APP_COUNT):
+        app_path = tmp_path / f"app_{index}"
+        template_dir = app_path / "templates" / "sage_invoice"
+        template_dir.mkdir(parents=True)
+        (template_dir / f"invoice_quotation_{index}.jinja2").write_text("")
+        (template_dir / f"invoice_receipt_{index}.jinja2").write_text("")
+        app_configs.append(SimpleNamespace(path=str(app_path)))
+
+    with mock.patch.object(apps, "get_app_configs", return_value=app_configs):
+        yield tmp_path
+
+
+def uncached_choices(is_receipt=False):
+    """The per-call discovery used before the registry."""
+    discovery = JinjaTemplateDiscovery()
+    templates = discovery.get_default_templates(is_receipt=is_receipt)
+    templates += discovery.get_custom_templates(is_receipt=is_receipt)
+    return [(template, template) for template in templates]
+
+
+class TestTemplateChoiceRegistry:
+
+    def test_matches_uncached_discovery(self, installed_apps):
+        for is_receipt in (False, True):
+            assert sorted(get_template_choices(is_receipt)) == sorted(
+                uncached_choices(is_receipt)
+            )
+
+    def test_repeated_calls_do_not_list_directories(self, installed_apps):
+        get_template_choices()
+
+        with mock.patch("os.listdir", side_effect=AssertionError):
+            choices = get_template_choices()
+
+        assert ("invoice_quotation_0", "invoice_quotation_0") in choices
+
+    def test_added_template_invalidates_directory(self, installed_apps):
+        template_dir = installed_apps / "app_0" / "templates" / "sage_invoice"
+        get_template_choices()
+
+        (template_dir / "invoice_quotation_new.jinja2").write_text("")
+        stat = os.stat(template_dir)
+        os.utime(template_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        assert ("invoice_quotation_new", "invoice_quotation_new") in (
+            get_template_choices()
+        )
+
+    def test_choices_are_kept_per_receipt_flag(self, installed_apps):
+        quotations = get_template_choices(is_receipt=False)
+        receipts = get_template_choices(is_receipt=True)
+
+        assert all("receipt" not in value for value, _ in quotations)
+        assert all("receipt" in value for value, _ in receipts)
+
+
+class TestTemplateManifest:
+
+    @pytest.fixture
+    def manifest_path(self, tmp_path, settings):
+        path = tmp_path / "manifest.json"
+        settings.SAGE_INVOICE_TEMPLATE_MANIFEST = str(path)
+        return path
+
+    def test_manifest_lists_every_template(self):
+        manifest = JinjaTemplateDiscovery().build_manifest()
+
+        assert {"quotation_1", "receipt1"} <= {
+            template["name"] for template in manifest["templates"]
+        }
+        assert {
+            "name": "receipt1",
+            "app": "sage_invoice",
+            "directory": "default_invoices",
+            "receipt": True,
+        } in manifest["templates"]
+
+    def test_choices_are_read_from_manifest(self, manifest_path, settings):
+        settings.DEBUG = False
+        write_manifest(
+            str(manifest_path),
+            {
+                "version": 1,
+                "templates": [
+                    {
+                        "name": "quotation_9",
+                        "app": "sage_invoice",
+                        "directory": "default_invoices",
+                        "receipt": False,
+                    }
+                ],
+            },
+        )
+
+        with mock.patch("os.listdir", side_effect=AssertionError):
+            choices = get_template_choices()
+
+        assert choices == [("quotation_9", "quotation_9")]
+
+    def test_missing_manifest_falls_back_to_scanning(self, manifest_path, settings):
+        settings.DEBUG = False
+
+        assert ("quotation_1", "quotation_1") in get_template_choices()
+
+    def test_debug_rebuilds_manifest(self, manifest_path, settings):
+        settings.DEBUG = True
+        write_manifest(str(manifest_path), {"version": 1, "templates": []})
+
+        choices = get_template_choices()
+
+        manifest = json.loads(manifest_path.read_text())
+        assert ("quotation_1", "quotation_1") in choices
+        assert manifest == JinjaTemplateDiscovery().build_manifest()
+
+
+IMPORT_SCRIPT = textwrap.dedent(
+    """
+    import os
+
+    import django
+    from django.conf import settings
+
+    settings.configure(
+        INSTALLED_APPS=[
+            "django.contrib.contenttypes",
+            "django.contrib.auth",
+            "django_jsonform",
+            "sage_invoice",
+        ],
+        DATABASES={"default": {"ENGINE": "django.db.backends.sqlite3"}},
+        SAGE_MODEL_PREFIX="invoice",
+        SAGE_MODEL_TEMPLATE="sage_invoice",
+    )
+
+    touched = []
+
+    def spy(function):
+        def wrapper(path, *args, **kwargs):
+            if "default_invoices" in os.fspath(path) or os.fspath(path).endswith(
+                os.path.join("templates", "sage_invoice")
+            ):
+                touched.append(os.fspath(path))
+            return function(path, *args, **kwargs)
+        return wrapper
+
+    os.listdir = spy(os.listdir)
+    os.scandir = spy(os.scandir)
+    os.stat = spy(os.stat)
+
+    django.setup()
+    import sage_invoice.models  # noqa: F401
+
+    print(touched)
+    """
+)
+
+
+def test_importing_models_does_not_scan_templates():
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(apps.get_app_config("sage_invoice").path),
+    )
+
+    assert result.stdout.strip() == "[]", result.stdout
+
+
+@pytest.mark.django_db
+def test_migrations_keep_template_choices_lazy():
+    # Fails with SystemExit if the models differ from the migrations
+    call_command(
+        "makemigrations", "sage_invoice", check=True, dry_run=True, stdout=StringIO()
+    )
+
+
+class TestTemplateChoiceBenchmark:
+
+    def test_choices_without_registry(self, benchmark, installed_apps):
+        """Per-request cost of a receipt toggle before the registry."""
+        benchmark.group = f"template choices with {APP_COUNT} apps"
+        assert benchmark(uncached_choices, True)
+
+    def test_choices_with_registry(self, benchmark, installed_apps):
+        """Per-request cost of a receipt toggle with the registry warm."""
+        benchmark.group = f"template choices with {APP_COUNT} apps"
+        assert benchmark(get_template_choices, True)
@@ -0,0 +1,122 @@
+import os
+from decimal import Decimal
+
+import pytest
+from django.apps import apps
+from django.templatetags.static import static
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from sage_invoice.service.environment import (
+    clear_environments,
+    get_bytecode_cache,
+    get_environment,
+)
+from sage_invoice.service.invoice_create import QuotationService
+
+DEFAULT_TEMPLATE_DIR = os.path.join(
+    apps.get_app_config("sage_invoice").path, "templates", "default_invoices"
+)
+DEFAULT_TEMPLATES = sorted(
+    filename
+    for filename in os.listdir(DEFAULT_TEMPLATE_DIR)
+    if filename.endswith(".jinja2")
+)
+
+
+def sample_context():
+    return {
+        "title": "Benchmark Invoice",
+        "tracking_code": "INV-20240910-1234",
+        "items": [
+            {
+                "description": f"Item {index}",
+                "quantity": 2,
+                "measurement": "pcs",
+                "unit_price": Decimal("10.00"),
+                "total_price": Decimal("20.00"),
+                "custom_data": {"Color": "Red"},
+            }
+            for index in range(20)
+        ],
+        "subtotal": Decimal("400.00"),
+        "tax_percentage": Decimal("10.00"),
+        "tax_amount": Decimal("40.00"),
+        "discount_percentage": Decimal("5.00"),
+        "discount_amount": Decimal("20.00"),
+        "concession_percentage": Decimal("0.00"),
+        "concession_amount": Decimal("0.00"),
+        "grand_total": Decimal("420.00"),
+        "invoice_date": "2024-09-10",
+        "customer_name": "John Doe",
+        "customer_email": "john@example.com",
+        "customer_phone": "1234567890",
+        "due_date": "2024-09-20",
+        "status": "unpaid",
+        "currency": "USD",
+        "custom_columns": {"Color"},
+        "additional_fields": {},
+    }
+
+
+@pytest.fixture
+def fresh_registry(settings, tmp_path):
+    settings.SAGE_INVOICE_BYTECODE_CACHE_DIR = str(tmp_path)
+    clear_environments()
+    yield tmp_path
+    clear_environments()
+
+
+class TestEnvironmentRegistry:
+
+    def test_environment_is_shared_per_search_path(self, fresh_registry):
+        first = get_environment([DEFAULT_TEMPLATE_DIR])
+        second = get_environment([DEFAULT_TEMPLATE_DIR])
+        other = get_environment([DEFAULT_TEMPLATE_DIR, str(fresh_registry)])
+
+        assert first is second
+        assert first is not other
+
+    def test_services_share_environment(self, fresh_registry):
+        assert QuotationService().env is QuotationService().env
+
+    def test_bytecode_cache_is_written_to_disk(self, fresh_registry):
+        env = get_environment([DEFAULT_TEMPLATE_DIR])
+        env.get_template(DEFAULT_TEMPLATES[0])
+
+        assert os.listdir(fresh_registry)
+
+    def test_bytecode_cache_can_be_disabled(self, settings):
+        settings.SAGE_INVOICE_BYTECODE_CACHE_DIR = False
+        assert get_bytecode_cache() is None
+
+
+@pytest.mark.parametrize("template_name", DEFAULT_TEMPLATES)
+class TestRenderBenchmark:
+
+    def test_render_with_fresh_environment(self, benchmark, template_name):
+        """Per-invoice latency when every render builds its own environment."""
+        benchmark.group = f"render {template_name}"
+        context = sample_context()
+
+        def render():
+            env = Environment(
+                loader=FileSystemLoader(DEFAULT_TEMPLATE_DIR),
+                autoescape=select_autoescape(["html", "xml"]),
+            )
+            env.globals["static"] = static
+            return env.get_template(template_name).render(context)
+
+        assert benchmark(render)
+
+    def test_render_with_shared_environment(
+        self, benchmark, fresh_registry, template_name
+    ):
+        """Per-invoice latency with the shared, bytecode-cached environment."""
+        benchmark.group = f"render {template_name}"
+        context = sample_context()
+
+        def render():
+            env = get_environment([DEFAULT_TEMPLATE_DIR])
+            return env.get_template(template_name).render(context)
+
+        assert benchmark(render)
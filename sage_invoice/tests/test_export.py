@@ -0,0 +1,160 @@
+import csv
+import gzip
+import io
+import json
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from sage_invoice.models import (
+    Category,
+    Column,
+    CustomerProfile,
+    Expense,
+    Invoice,
+    Item,
+)
+from sage_invoice.resource import InvoiceResource
+from sage_invoice.service.export import ExportService
+from sage_invoice.views.invoice import ExportInvoicesView
+
+
+def make_invoices(count):
+    category, _ = Category.objects.get_or_create(
+        title="Export", defaults={"description": "Exported, with a comma"}
+    )
+    invoices = []
+    for index in range(count):
+        invoice = Invoice.objects.create(
+            title=f"Streamed Invoice {Invoice.objects.count()}",
+            invoice_date="2024-09-11",
+            status="paid",
+            tracking_code=f"INV-S{index}",
+            due_date="2024-09-30",
+            template_choice="quotation_1",
+            category=category,
+        )
+        CustomerProfile.objects.create(
+            invoice=invoice, name="Jane Doe", contact={"email": "jane@example.com"}
+        )
+        item = Item.objects.create(
+            invoice=invoice, description="Item", quantity=1, unit_price=10
+        )
+        Column.objects.create(
+            invoice=invoice, item=item, column_name="Size", value="L", priority=1
+        )
+        Expense.objects.create(invoice=invoice, tax_percentage=Decimal("10.00"))
+        invoices.append(invoice)
+    return invoices
+
+
+def read_csv(data):
+    return list(csv.DictReader(io.StringIO(data.decode())))
+
+
+@pytest.mark.django_db
+class TestExportService:
+
+    def test_csv_matches_resource_export(self):
+        make_invoices(3)
+
+        data = b"".join(ExportService("csv").stream())
+
+        dataset = InvoiceResource().export()
+        assert read_csv(data) == read_csv(dataset.csv.encode())
+
+    def test_jsonl_matches_resource_export(self):
+        make_invoices(3)
+
+        data = b"".join(ExportService("jsonl").stream())
+
+        rows = [json.loads(line) for line in data.decode().splitlines()]
+        assert rows == InvoiceResource().export().dict
+
+    @pytest.mark.parametrize("file_format", ExportService.formats)
+    def test_gzip(self, file_format):
+        make_invoices(3)
+
+        plain = b"".join(ExportService(file_format).stream())
+        compressed = b"".join(ExportService(file_format, compress=True).stream())
+
+        assert gzip.decompress(compressed) == plain
+
+    def test_given_queryset(self):
+        invoices = make_invoices(3)
+
+        data = b"".join(
+            ExportService().stream(Invoice.objects.filter(pk=invoices[1].pk))
+        )
+
+        assert [row["title"] for row in read_csv(data)] == [invoices[1].title]
+
+    def test_invoices_are_read_lazily(self):
+        make_invoices(6)
+
+        stream = ExportService(chunk_size=2).stream()
+        with CaptureQueriesContext(connection) as captured:
+            next(stream)
+
+        # The invoice page and its items and columns: later chunks are unread
+        assert len(captured.captured_queries) == 3
+
+    def test_queries_grow_with_chunks_only(self):
+        def export_queries(count):
+            Invoice.objects.all().delete()
+            make_invoices(count)
+            with CaptureQueriesContext(connection) as captured:
+                service = ExportService(chunk_size=100)
+                service.write(io.BytesIO())
+            assert service.row_count == count
+            return len(captured.captured_queries)
+
+        assert export_queries(2) == export_queries(12)
+
+    def test_unsupported_format(self):
+        with pytest.raises(ValueError):
+            ExportService("xlsx")
+
+
+@pytest.mark.django_db
+class TestExportInvoicesView:
+
+    def get(self, query):
+        request = RequestFactory().get("/export-invoices/", query)
+        request.user = User(username="staff", is_staff=True)
+        return ExportInvoicesView.as_view()(request)
+
+    def test_csv(self):
+        invoices = make_invoices(2)
+
+        response = self.get({"invoice_ids": str(invoices[0].id)})
+
+        assert response["Content-Type"] == "text/csv"
+        assert 'filename="invoices.csv"' in response["Content-Disposition"]
+        rows = read_csv(b"".join(response.streaming_content))
+        assert [row["title"] for row in rows] == [invoices[0].title]
+
+    def test_gzip_jsonl(self):
+        make_invoices(2)
+
+        response = self.get({"format": "jsonl", "gzip": "1"})
+
+        assert response["Content-Type"] == "application/gzip"
+        assert 'filename="invoices.jsonl.gz"' in response["Content-Disposition"]
+        data = gzip.decompress(b"".join(response.streaming_content))
+        assert len(data.decode().splitlines()) == 2
+
+    def test_unsupported_format(self):
+        response = self.get({"format": "xlsx"})
+        assert response.status_code == 400
+
+    def test_requires_staff(self):
+        request = RequestFactory().get("/export-invoices/")
+        request.user = User(username="customer")
+        with pytest.raises(PermissionDenied):
+            ExportInvoicesView.as_view()(request)
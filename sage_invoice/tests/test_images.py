@@ -0,0 +1,157 @@
+import base64
+import hashlib
+import io
+from unittest import mock
+
+import pytest
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from sage_invoice.models import Invoice
+from sage_invoice.service.images import ImageRenditionService
+from sage_invoice.service.invoice_create import QuotationService
+
+
+def make_upload(name, size=(3000, 1500), mode="RGB", image_format="PNG"):
+    buffer = io.BytesIO()
+    Image.effect_noise(size, 64).convert(mode).save(buffer, format=image_format)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@pytest.mark.django_db
+class TestImageRenditions:
+
+    @pytest.fixture(autouse=True)
+    def media_root(self, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path)
+        settings.MEDIA_URL = "/media/"
+        settings.SAGE_INVOICE_RENDER_CACHE = None
+
+    @pytest.fixture
+    def invoice(self):
+        return Invoice.objects.create(
+            title="Branded Invoice",
+            invoice_date="2024-09-10",
+            tracking_code="INV-IMG",
+            status="unpaid",
+            due_date="2024-10-10",
+            template_choice="quotation_1",
+            logo=make_upload("logo.png"),
+            stamp=make_upload("stamp.jpg", image_format="JPEG"),
+        )
+
+    def test_upload_creates_smaller_renditions(self, invoice):
+        service = ImageRenditionService()
+
+        for field_file, max_size in (
+            (invoice.logo, (400, 200)),
+            (invoice.stamp, (300, 300)),
+        ):
+            name = service.rendition_name(field_file)
+            assert field_file.storage.exists(name)
+            with field_file.storage.open(name) as rendition:
+                width, height = Image.open(rendition).size
+            assert width <= max_size[0] and height <= max_size[1]
+            assert field_file.storage.size(name) < field_file.size / 10
+
+    def test_rendition_keeps_format_of_png(self, invoice):
+        name = ImageRenditionService().rendition_name(invoice.logo)
+
+        assert name.endswith("_rendition.png")
+        with invoice.logo.storage.open(name) as rendition:
+            assert Image.open(rendition).format == "PNG"
+
+    def test_render_context_uses_renditions(self, invoice):
+        context = QuotationService().render_context(invoice)
+
+        assert context["logo_url"].endswith("logo_rendition.png")
+        assert context["stamp_url"].endswith("stamp_rendition.jpg")
+        assert context["sign_url"] is None
+
+    def test_embedded_images_are_data_uris(self, invoice):
+        context = QuotationService(embed_images=True).render_context(invoice)
+
+        assert context["logo_url"].startswith("data:image/png;base64,")
+        assert context["stamp_url"].startswith("data:image/jpeg;base64,")
+
+    def test_renditions_are_recorded(self, invoice):
+        invoice.refresh_from_db()
+        service = ImageRenditionService()
+
+        for field_file in (invoice.logo, invoice.stamp):
+            name = service.rendition_name(field_file)
+            with field_file.storage.open(name) as rendition:
+                digest = hashlib.sha256(rendition.read()).hexdigest()
+            assert invoice.image_renditions[field_file.field.name] == {
+                "source": field_file.name,
+                "name": name,
+                "digest": digest,
+            }
+        assert "signature" not in invoice.image_renditions
+
+    def test_new_uploads_are_tracked_before_save(self, invoice):
+        invoice.signature = make_upload("signature.png")
+
+        assert ImageRenditionService().get_uploads(invoice) == {"signature"}
+
+    def test_regenerated_rendition_is_not_served_from_cache(self, invoice):
+        service = ImageRenditionService()
+        before = service.get_url(invoice, "logo", embed=True)
+        # Overwrite the upload in place, as storages that overwrite files do
+        storage, name = invoice.logo.storage, invoice.logo.name
+        storage.delete(name)
+        storage.save(name, make_upload("logo.png", size=(800, 400)))
+
+        service.process(invoice, uploads={"logo"})
+
+        after = service.get_url(invoice, "logo", embed=True)
+        assert after != before
+        with storage.open(service.rendition_name(invoice.logo)) as rendition:
+            assert after.endswith(base64.b64encode(rendition.read()).decode())
+
+    def test_render_does_not_query_storage(self, invoice):
+        with mock.patch.object(
+            FileSystemStorage, "exists", side_effect=AssertionError
+        ), mock.patch.object(FileSystemStorage, "save") as save:
+            invoice.title = "Renamed Invoice"
+            invoice.save()
+            QuotationService().render_context(invoice)
+
+        save.assert_not_called()
+
+    def test_falls_back_to_original_without_rendition(self, invoice):
+        invoice.logo = make_upload("new_logo.png")
+        invoice.image_renditions = {}
+
+        url = ImageRenditionService().get_url(invoice, "logo")
+
+        assert url == invoice.logo.url
+
+    def test_new_upload_replaces_rendition(self, invoice):
+        invoice.logo = make_upload("new_logo.png")
+        invoice.save()
+
+        url = ImageRenditionService().get_url(invoice, "logo")
+
+        assert url.endswith("new_logo_rendition.png")
+
+    @pytest.mark.parametrize(
+        "template_name", ["quotation_1", "quotation_2", "quotation_3"]
+    )
+    def test_templates_show_renditions(self, invoice, template_name):
+        invoice.template_choice = template_name
+        context = QuotationService().render_context(invoice)
+
+        html = QuotationService().render_invoice(invoice, context)
+
+        assert context["logo_url"] in html
+        assert 'src="logo.png"' not in html
+
+    def test_unreadable_image_is_skipped(self, invoice):
+        invoice.signature = SimpleUploadedFile("signature.png", b"not an image")
+        invoice.save()
+
+        name = ImageRenditionService().rendition_name(invoice.signature)
+        assert not invoice.signature.storage.exists(name)
+        assert invoice.image_renditions["signature"]["name"] is None
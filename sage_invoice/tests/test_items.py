@@ -0,0 +1,117 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from sage_invoice.api.views import ItemViewSet
+from sage_invoice.models import Expense, Invoice, Item
+from sage_invoice.service.items import ItemService
+from sage_invoice.service.total import ExpenseService
+
+
+def make_rows(count):
+    return [
+        {
+            "description": f"Line {position}",
+            "quantity": position % 4,
+            "measurement": "pcs",
+            "unit_price": Decimal("1.25"),
+        }
+        for position in range(count)
+    ]
+
+
+@pytest.fixture
+def invoice():
+    return Invoice.objects.create(
+        title="Bulk Invoice",
+        invoice_date="2024-09-10",
+        tracking_code="INV-BULK",
+        status="unpaid",
+        due_date="2024-10-10",
+        template_choice="quotation_1",
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBulkAddItems:
+
+    def test_adds_items_and_totals(self, invoice):
+        items = ItemService().bulk_add_items(invoice, make_rows(8))
+
+        assert len(items) == Item.objects.filter(invoice=invoice).count() == 8
+        assert [item.total_price for item in items[:2]] == [
+            Decimal("1.25"),
+            Decimal("1.25"),
+        ]
+        expense = Expense.objects.get(invoice=invoice)
+        # Quantities 0, 1, 2, 3 twice; no quantity costs one unit
+        assert expense.subtotal == Decimal("17.50")
+        assert Invoice.objects.get(pk=invoice.pk).item_count == 8
+
+    def test_recalculates_totals_once(self, invoice, mocker):
+        recalculate = mocker.spy(ExpenseService, "recalculate")
+
+        with CaptureQueriesContext(connection) as captured:
+            ItemService().bulk_add_items(invoice, make_rows(2000))
+
+        recalculate.assert_called_once()
+        inserts = [
+            query["sql"]
+            for query in captured.captured_queries
+            if query["sql"].startswith('INSERT INTO "sage_invoice_items"')
+        ]
+        # One INSERT per batch the database accepts, not one per item
+        assert 0 < len(inserts) <= 20
+
+    def test_empty_rows(self, invoice):
+        assert ItemService().bulk_add_items(invoice, []) == []
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBulkItemsAction:
+
+    view = staticmethod(ItemViewSet.as_view({"post": "bulk"}))
+
+    def post(self, data):
+        request = APIRequestFactory().post("/items/bulk/", data, format="json")
+        return self.view(request)
+
+    def test_creates_items(self, invoice):
+        rows = [{**row, "unit_price": str(row["unit_price"])} for row in make_rows(3)]
+
+        response = self.post({"invoice": invoice.slug, "items": rows})
+
+        assert response.status_code == 201
+        assert response.data == {"invoice": invoice.slug, "count": 3}
+        assert Expense.objects.get(invoice=invoice).subtotal == Decimal("5.00")
+
+    def test_rejects_invalid_rows(self, invoice):
+        response = self.post(
+            {"invoice": invoice.slug, "items": [{"description": "No price"}]}
+        )
+
+        assert response.status_code == 400
+        assert "unit_price" in response.data["items"][0]
+        assert not Item.objects.exists()
+
+    def test_ingests_5000_lines(self, benchmark, invoice):
+        rows = [
+            {**row, "unit_price": str(row["unit_price"])} for row in make_rows(5000)
+        ]
+
+        def clear_items():
+            Item.objects.filter(invoice=invoice).delete()
+
+        benchmark.group = "bulk add 5000 items"
+        response = benchmark.pedantic(
+            self.post,
+            args=({"invoice": invoice.slug, "items": rows},),
+            setup=clear_items,
+            rounds=3,
+        )
+
+        assert response.status_code == 201
+        assert Invoice.objects.get(pk=invoice.pk).item_count == 5000
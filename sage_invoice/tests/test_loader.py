@@ -0,0 +1,103 @@
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from jinja2 import TemplateNotFound
+
+from sage_invoice.models import Invoice, Item
+from sage_invoice.service.discovery import template_registry
+from sage_invoice.service.environment import clear_environments
+from sage_invoice.service.invoice_create import QuotationService
+from sage_invoice.service.loader import template_index
+
+
+@pytest.fixture(autouse=True)
+def fresh_index(settings):
+    settings.SAGE_INVOICE_RENDER_CACHE = None
+    template_registry.clear()
+    clear_environments()
+    yield
+    template_registry.clear()
+    clear_environments()
+
+
+class TestTemplateIndex:
+
+    @pytest.mark.parametrize(
+        "template_id, is_receipt, name",
+        [
+            ("quotation_1", False, "quotation_1.jinja2"),
+            ("receipt2", True, "receipt2.jinja2"),
+            ("3", False, "quotation_3.jinja2"),
+            ("3", True, "receipt3.jinja2"),
+            ("quotation_2", True, "receipt2.jinja2"),
+        ],
+    )
+    def test_resolve(self, template_id, is_receipt, name):
+        assert template_index.resolve(template_id, is_receipt) == name
+
+    def test_lookups_do_not_touch_disk(self):
+        template_index.resolve("quotation_1")
+
+        with mock.patch("os.listdir", side_effect=AssertionError), mock.patch(
+            "os.stat", side_effect=AssertionError
+        ):
+            assert template_index.resolve("receipt1", True) == "receipt1.jinja2"
+            assert template_index.get_path("receipt1.jinja2").endswith(
+                "default_invoices/receipt1.jinja2"
+            )
+
+    def test_missing_template_lists_available(self, settings):
+        settings.DEBUG = False
+
+        with pytest.raises(TemplateNotFound) as error:
+            template_index.resolve("quotation_9")
+
+        assert "No quotation template matches 'quotation_9'" in str(error.value)
+        assert "quotation_1" in str(error.value)
+
+    def test_environment_loads_through_index(self):
+        env = QuotationService().env
+
+        template = env.get_template(template_index.resolve("4", False))
+
+        assert template.filename == template_index.get_path("quotation_4.jinja2")
+        assert sorted(env.list_templates()) == template_index.list_templates()
+
+
+@pytest.mark.django_db
+class TestRenderQuotation:
+
+    @pytest.fixture
+    def invoice(self):
+        invoice = Invoice.objects.create(
+            title="Indexed Invoice",
+            invoice_date="2024-09-10",
+            tracking_code="INV-IDX",
+            status="unpaid",
+            due_date="2024-10-10",
+            template_choice="receipt1",
+            receipt=True,
+        )
+        Item.objects.create(
+            invoice=invoice,
+            description="Indexed item",
+            quantity=2,
+            unit_price=Decimal("5.00"),
+        )
+        return invoice
+
+    def test_render_quotation(self, invoice):
+        html = QuotationService().render_quotation(
+            Invoice.objects.filter(pk=invoice.pk)
+        )
+
+        assert "Indexed Invoice" in html
+        assert "Indexed item" in html
+
+    def test_render_quotation_missing_template(self, invoice, settings):
+        settings.DEBUG = False
+        Invoice.objects.filter(pk=invoice.pk).update(template_choice="receipt9")
+
+        with pytest.raises(TemplateNotFound):
+            QuotationService().render_quotation(Invoice.objects.filter(pk=invoice.pk))
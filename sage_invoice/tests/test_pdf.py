@@ -0,0 +1,136 @@
+from decimal import Decimal
+
+import pytest
+from django.test import RequestFactory
+from rest_framework.test import APIRequestFactory
+
+from sage_invoice.admin.actions import export_pdf
+from sage_invoice.api.views import InvoiceViewSet
+from sage_invoice.models import Expense, Invoice, Item
+from sage_invoice.service.pdf import (
+    PDFBackend,
+    PDFService,
+    WeasyPrintBackend,
+    is_pdf_available,
+    shutdown_pool,
+)
+
+
+class FakeBackend(PDFBackend):
+    """Backend that wraps the HTML so tests can inspect what was converted."""
+
+    def render(self, html, base_url=None):
+        return b"%PDF-fake\n" + html.encode()
+
+
+class MissingBackend(FakeBackend):
+    required_library = "sage_invoice_missing_pdf_library"
+
+
+@pytest.mark.django_db
+class TestPDFService:
+
+    @pytest.fixture(autouse=True)
+    def fake_backend(self, settings):
+        settings.SAGE_INVOICE_PDF_BACKEND = "sage_invoice.tests.test_pdf.FakeBackend"
+        settings.SAGE_INVOICE_PDF_WORKERS = 0
+        settings.ROOT_URLCONF = "sage_invoice.urls"
+        yield
+        shutdown_pool()
+
+    @pytest.fixture
+    def invoices(self, db):
+        invoices = []
+        for index in range(3):
+            invoice = Invoice.objects.create(
+                title=f"PDF Invoice {index}",
+                invoice_date="2024-09-10",
+                tracking_code=f"INV-{index}",
+                status="unpaid",
+                due_date="2024-10-10",
+                template_choice="quotation_1",
+            )
+            Expense.objects.create(invoice=invoice)
+            Item.objects.create(
+                invoice=invoice,
+                description="Item",
+                quantity=1,
+                unit_price=Decimal("10.00"),
+            )
+            invoices.append(invoice)
+        return invoices
+
+    def test_render_pdf(self, invoices):
+        pdf = PDFService().render_pdf(invoices[0])
+
+        assert pdf.startswith(b"%PDF")
+        assert b"PDF Invoice 0" in pdf
+
+    def test_render_pdfs_in_order(self, invoices):
+        ids = [invoice.id for invoice in reversed(invoices)]
+
+        rendered = list(PDFService().render_pdfs(ids))
+
+        assert [invoice.id for invoice, _ in rendered] == ids
+        assert all(pdf.startswith(b"%PDF") for _, pdf in rendered)
+
+    def test_render_pdfs_on_worker_pool(self, invoices, settings):
+        settings.SAGE_INVOICE_PDF_WORKERS = 2
+
+        rendered = list(PDFService().render_pdfs([invoice.id for invoice in invoices]))
+
+        assert [invoice.id for invoice, _ in rendered] == [
+            invoice.id for invoice in invoices
+        ]
+        assert b"PDF Invoice 2" in rendered[2][1]
+
+    def test_backend_availability(self, settings):
+        assert is_pdf_available()
+        settings.SAGE_INVOICE_PDF_BACKEND = "sage_invoice.tests.test_pdf.MissingBackend"
+        assert not is_pdf_available()
+        assert WeasyPrintBackend.required_library == "weasyprint"
+
+    def test_api_reports_missing_backend(self, invoices, settings):
+        settings.SAGE_INVOICE_PDF_BACKEND = "sage_invoice.tests.test_pdf.MissingBackend"
+        view = InvoiceViewSet.as_view({"get": "pdf"})
+
+        response = view(APIRequestFactory().get("/"), slug=invoices[0].slug)
+
+        assert response.status_code == 501
+        assert response.data["code"] == "pdf_unavailable"
+
+    def test_export_pdf_action_returns_pdf(self, invoices):
+        request = RequestFactory().get("/")
+        queryset = Invoice.objects.filter(id=invoices[0].id)
+
+        response = export_pdf(None, request, queryset)
+
+        assert response["Content-Type"] == "application/pdf"
+        assert response["Content-Disposition"] == (
+            f'attachment; filename="PDF_Invoice_0_invoice_{invoices[0].id}.pdf"'
+        )
+
+    @pytest.mark.parametrize(
+        "title, filename",
+        [('Acme "Q3" quote', "Acme_Q3_quote"), ("Acme\nQ3 quote", "AcmeQ3_quote")],
+    )
+    def test_pdf_filename_is_header_safe(self, invoices, title, filename):
+        Invoice.objects.filter(pk=invoices[0].pk).update(title=title)
+        view = InvoiceViewSet.as_view({"get": "pdf"})
+
+        response = view(APIRequestFactory().get("/"), slug=invoices[0].slug)
+
+        assert response.status_code == 200
+        assert response["Content-Disposition"] == (
+            f'attachment; filename="{filename}_invoice_{invoices[0].id}.pdf"'
+        )
+
+    def test_export_pdf_action_falls_back_to_browser(self, invoices, settings):
+        settings.SAGE_INVOICE_PDF_BACKEND = "sage_invoice.tests.test_pdf.MissingBackend"
+        request = RequestFactory().get("/")
+        queryset = Invoice.objects.filter(id=invoices[0].id)
+
+        response = export_pdf(None, request, queryset)
+
+        assert response.status_code == 302
+        assert f"invoice_ids={invoices[0].id}" in response.url
@@ -0,0 +1,129 @@
+import random
+from decimal import ROUND_HALF_UP, Decimal
+
+import pytest
+
+from sage_invoice.models import Expense
+from sage_invoice.service.quote import BatchQuoteService
+from sage_invoice.service.total import ExpenseService
+
+from .test_total import make_invoice, random_case
+
+PERCENTAGE_FIELDS = ("tax_percentage", "discount_percentage", "concession_percentage")
+
+
+def to_minor(value):
+    return int(Decimal(value) * 100)
+
+
+def batch_arguments(cases):
+    line_counts, quantities, unit_prices = [], [], []
+    percentages = {name: [] for name in PERCENTAGE_FIELDS}
+    for items, invoice_percentages in cases:
+        line_counts.append(len(items))
+        for quantity, unit_price in items:
+            quantities.append(quantity or 0)
+            unit_prices.append(to_minor(unit_price))
+        for name in PERCENTAGE_FIELDS:
+            percentages[name].append(to_minor(invoice_percentages.get(name, 0)))
+    return (
+        line_counts,
+        quantities,
+        unit_prices,
+        *(percentages[name] for name in PERCENTAGE_FIELDS),
+    )
+
+
+def rows(batch):
+    return [tuple(int(amount) for amount in row) for row in zip(*batch)]
+
+
+@pytest.fixture(params=[False, True], ids=["python", "numpy"])
+def service(request):
+    if request.param:
+        pytest.importorskip("numpy")
+    return BatchQuoteService(use_numpy=request.param)
+
+
+@pytest.mark.django_db
+class TestBatchQuoteService:
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_matches_expense_service(self, service, seed):
+        """Stored ExpenseService amounts equal the batch amounts to the cent."""
+        rng = random.Random(seed)
+        cases = [random_case(rng) for _ in range(8)]
+        expenses = [
+            make_invoice(rng, f"{seed}-{index}", *case)
+            for index, case in enumerate(cases)
+        ]
+        ExpenseService().recalculate(expense.invoice_id for expense in expenses)
+
+        stored = [
+            tuple(
+                to_minor(getattr(Expense.objects.get(pk=expense.pk), field))
+                for field in ExpenseService.amount_fields
+            )
+            for expense in expenses
+        ]
+        assert rows(service.quote(*batch_arguments(cases))) == stored
+
+    def test_half_cent_ties(self, service):
+        cases = [
+            ([(None, Decimal("0.05"))], {"tax_percentage": Decimal("10")}),
+            ([(None, Decimal("0.15"))], {"tax_percentage": Decimal("10")}),
+        ]
+
+        assert [row[1] for row in rows(service.quote(*batch_arguments(cases)))] == [
+            0,
+            2,
+        ]
+        half_up = BatchQuoteService(ROUND_HALF_UP, use_numpy=service.use_numpy)
+        assert [row[1] for row in rows(half_up.quote(*batch_arguments(cases)))] == [
+            1,
+            2,
+        ]
+
+    def test_empty_invoices(self, service):
+        batch = service.quote([0, 2, 0], [0, 3], [150, 200], [0] * 3, [0] * 3, [0] * 3)
+
+        assert rows(batch) == [(0,) * 5, (750, 0, 0, 0, 750), (0,) * 5]
+
+    def test_mismatched_lengths(self, service):
+        with pytest.raises(ValueError):
+            service.quote([2], [1], [100], [0], [0], [0])
+
+
+class TestBatchQuoteBenchmark:
+    """Cost of quoting 200 invoices of 10 lines each."""
+
+    @pytest.fixture
+    def cases(self):
+        rng = random.Random(0)
+        return [
+            (
+                [(rng.randint(1, 10), Decimal(rng.randint(1, 99999)) / 100)] * 10,
+                {
+                    name: Decimal(rng.randint(0, 2500)) / 100
+                    for name in PERCENTAGE_FIELDS
+                },
+            )
+            for _ in range(200)
+        ]
+
+    @pytest.mark.django_db
+    def test_expense_service(self, benchmark, cases):
+        rng = random.Random(0)
+        expenses = [
+            make_invoice(rng, index, *case) for index, case in enumerate(cases)
+        ]
+        service = ExpenseService()
+        benchmark.group = "quote 200 invoices"
+        benchmark(
+            lambda: [service.calculate_and_save(expense) for expense in expenses]
+        )
+
+    def test_batch(self, benchmark, service, cases):
+        arguments = batch_arguments(cases)
+        benchmark.group = "quote 200 invoices"
+        assert len(benchmark(service.quote, *arguments).total_amount) == 200
@@ -184,3 +184,267 @@ class TestInvoiceResourceWithCategory:
         # Ensure that the category is not assigned
         invoice = Invoice.objects.get(id=row["id"])
         assert invoice.category is None
+
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from sage_invoice.models import CustomerProfile
+
+
+@pytest.mark.django_db
+class TestInvoiceResourceExport:
+
+    def make_invoices(self, count):
+        category, _ = Category.objects.get_or_create(
+            title="Export", defaults={"description": "Exported"}
+        )
+        for index in range(count):
+            invoice = Invoice.objects.create(
+                title=f"Exported Invoice {Invoice.objects.count()}",
+                invoice_date="2024-09-11",
+                status="paid",
+                tracking_code=f"INV-E{index}",
+                due_date="2024-09-30",
+                template_choice="quotation_1",
+                category=category,
+            )
+            CustomerProfile.objects.create(
+                invoice=invoice, name="Jane Doe", contact={"email": "jane@example.com"}
+            )
+            item = Item.objects.create(
+                invoice=invoice, description="Item", quantity=1, unit_price=10
+            )
+            Column.objects.create(
+                invoice=invoice, item=item, column_name="Size", value="L", priority=1
+            )
+            Expense.objects.create(invoice=invoice, tax_percentage=Decimal("10.00"))
+
+    def export_queries(self, count, queryset=None):
+        Invoice.objects.all().delete()
+        self.make_invoices(count)
+        with CaptureQueriesContext(connection) as captured:
+            dataset = InvoiceResource().export(queryset)
+        assert len(dataset) == count
+        return len(captured.captured_queries), dataset
+
+    def test_query_count_is_constant(self):
+        few, _ = self.export_queries(2)
+        many, dataset = self.export_queries(12)
+
+        assert few == many
+        assert dataset.dict[0]["items"] == "Item|1|10.00|10.00"
+        assert dataset.dict[0]["columns"] == "Size|L|1"
+        assert dataset.dict[0]["totals"] == "0.00|10.00|0.00|0.00"
+        assert dataset.dict[0]["category"] == "Export|Exported"
+
+    def test_query_count_is_constant_for_given_queryset(self):
+        few, _ = self.export_queries(2, Invoice.objects.all())
+        many, _ = self.export_queries(12, Invoice.objects.all())
+
+        assert few == many
+
+
+import tablib
+from sage_invoice.resource import BulkInvoiceResource
+
+IMPORT_HEADERS = [
+    "id",
+    "title",
+    "invoice_date",
+    "status",
+    "due_date",
+    "tracking_code",
+    "template_choice",
+    "items",
+    "columns",
+    "totals",
+    "category",
+]
+
+
+def import_dataset(invoices, lines):
+    dataset = tablib.Dataset(headers=IMPORT_HEADERS)
+    for index in range(1, invoices + 1):
+        dataset.append(
+            [
+                index,
+                f"Imported Invoice {index}",
+                "2024-01-01",
+                "paid",
+                "2024-02-01",
+                f"INV-{index}",
+                "quotation_1",
+                "; ".join(f"Line {line}|{line + 1}|2.50|0" for line in range(lines)),
+                "Size|L|1; Colour|Red|2",
+                f"{index}0.00|10.00|5.00|0.00",
+                "Imported|From spreadsheet",
+            ]
+        )
+    return dataset
+
+
+def imported_state():
+    return (
+        list(
+            Item.objects.order_by("invoice_id", "description").values_list(
+                "invoice_id", "description", "quantity", "unit_price", "total_price"
+            )
+        ),
+        list(
+            Column.objects.order_by("invoice_id", "column_name").values_list(
+                "invoice_id", "item__description", "column_name", "value", "priority"
+            )
+        ),
+        list(
+            Expense.objects.order_by("invoice_id").values_list(
+                "invoice_id",
+                "tax_percentage",
+                "discount_percentage",
+                "subtotal",
+                "total_amount",
+            )
+        ),
+        list(Invoice.objects.order_by("pk").values_list("pk", "category__title")),
+    )
+
+
+@pytest.mark.django_db
+class TestBulkInvoiceImport:
+
+    def test_matches_row_import(self):
+        InvoiceResource().import_data(import_dataset(3, 4), raise_errors=True)
+        expected = imported_state()
+        Invoice.objects.all().delete()
+
+        BulkInvoiceResource().import_data(import_dataset(3, 4), raise_errors=True)
+
+        assert imported_state() == expected
+        assert len(expected[0]) == 12
+        assert expected[1][0] == (1, "Line 3", "Colour", "Red", 2)
+
+    def test_updates_existing_records(self):
+        BulkInvoiceResource().import_data(import_dataset(2, 3), raise_errors=True)
+        dataset = import_dataset(2, 3)
+        dataset[0] = (
+            dataset[0][:7]
+            + ("Line 0|9|1.00|0; Line 5|1|4.00|0", "Size|XL|3", "5.00|20.00|0.00|0.00")
+            + dataset[0][10:]
+        )
+
+        BulkInvoiceResource().import_data(dataset, raise_errors=True)
+
+        items = dict(
+            Item.objects.filter(invoice_id=1).values_list("description", "quantity")
+        )
+        assert items == {"Line 0": 9, "Line 1": 2, "Line 2": 3, "Line 5": 1}
+        assert Column.objects.filter(invoice_id=1, column_name="Size").count() == 2
+        assert Expense.objects.get(invoice_id=1).tax_percentage == Decimal("20.00")
+        assert Expense.objects.count() == 2
+
+    def test_queries_do_not_grow_with_lines(self):
+        def import_queries(resource_class, lines):
+            Invoice.objects.all().delete()
+            with CaptureQueriesContext(connection) as captured:
+                resource_class().import_data(import_dataset(3, lines), raise_errors=True)
+            return len(captured.captured_queries)
+
+        # The first import creates the category
+        import_queries(BulkInvoiceResource, 1)
+
+        bulk = import_queries(BulkInvoiceResource, 40)
+        assert bulk == import_queries(BulkInvoiceResource, 2)
+        assert bulk < import_queries(InvoiceResource, 40) / 5
+
+    def test_blank_id_rows_get_relations(self):
+        dataset = import_dataset(2, 3)
+        dataset[1] = ("",) + dataset[1][1:]
+
+        BulkInvoiceResource().import_data(dataset, raise_errors=True)
+
+        invoice = Invoice.objects.get(title="Imported Invoice 2")
+        assert invoice.items.count() == 3
+        assert invoice.columns.count() == 2
+        assert invoice.category.title == "Imported"
+        assert Expense.objects.filter(invoice=invoice).exists()
+
+    def test_invalid_items(self):
+        dataset = import_dataset(1, 1)
+        dataset[0] = dataset[0][:7] + ("Broken item",) + dataset[0][8:]
+
+        result = BulkInvoiceResource().import_data(dataset)
+
+        assert result.has_errors()
+        assert "Invalid item data:Broken item" in str(result.base_errors[0].error)
+
+
+@pytest.mark.django_db
+class TestImportCategories:
+
+    def dataset(self, categories):
+        dataset = import_dataset(len(categories), 1)
+        for index, category in enumerate(categories):
+            dataset[index] = dataset[index][:10] + (category,)
+        return dataset
+
+    @pytest.mark.parametrize("resource_class", [InvoiceResource, BulkInvoiceResource])
+    def test_assigns_categories(self, resource_class):
+        Category.objects.create(title="Hosting", description="Old")
+
+        resource_class().import_data(
+            self.dataset(
+                ["Hosting|Servers", "Consulting|Advice", "Hosting|Servers", ""]
+            ),
+            raise_errors=True,
+        )
+
+        assert list(
+            Invoice.objects.order_by("pk").values_list("category__title", flat=True)
+        ) == ["Hosting", "Consulting", "Hosting", None]
+        assert dict(Category.objects.values_list("title", "description")) == {
+            "Hosting": "Servers",
+            "Consulting": "Advice",
+        }
+        assert Category.objects.get(title="Consulting").slug == "consulting"
+
+    @pytest.mark.parametrize("resource_class", [InvoiceResource, BulkInvoiceResource])
+    def test_blank_id_creates_invoice(self, resource_class):
+        dataset = self.dataset(["Hosting|Servers"])
+        # Without relations: the row import attaches them to the given id
+        dataset[0] = ("",) + dataset[0][1:7] + ("", "", "") + dataset[0][10:]
+
+        result = resource_class().import_data(dataset, raise_errors=True)
+
+        assert result.totals["new"] == 1
+        assert Invoice.objects.get().category.title == "Hosting"
+
+    def test_categories_resolved_once(self):
+        resource = BulkInvoiceResource()
+        resource.bulk_batch_size = 2
+        dataset = self.dataset(["Hosting|Servers"] * 6)
+
+        with CaptureQueriesContext(connection) as captured:
+            resource.import_data(dataset, raise_errors=True)
+
+        category_selects = [
+            query["sql"]
+            for query in captured.captured_queries
+            if query["sql"].startswith("SELECT")
+            and 'FROM "sage_invoice_cat"' in query["sql"]
+            and '"sage_invoice_cat"."title" IN' in query["sql"]
+        ]
+        assert len(category_selects) == 1
+        category_updates = [
+            query["sql"]
+            for query in captured.captured_queries
+            if query["sql"].startswith('UPDATE "sage_invoice" SET "category_id"')
+        ]
+        assert len(category_updates) == 3
+
+    def test_assignment_does_not_resave_invoices(self, mocker):
+        schedule = mocker.patch("sage_invoice.signals.schedule_recalculation")
+
+        InvoiceResource().import_data(
+            self.dataset(["Hosting|Servers"] * 3), raise_errors=True
+        )
+
+        assert schedule.call_count == 3
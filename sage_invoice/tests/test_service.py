@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import patch, MagicMock
 from jinja2.exceptions import TemplateNotFound
 from sage_invoice.service.invoice_create import QuotationService
-from sage_invoice.models import Invoice, Item, Expense
+from sage_invoice.models import Invoice, Item, Expense, Column, CustomerProfile
 from sage_invoice.service.total import ExpenseService
 from unittest import mock
 from decimal import Decimal
@@ -119,6 +119,98 @@ class TestQuotationService:
         with pytest.raises(ValidationError):
             invoice.clean()
 
+@pytest.mark.django_db
+class TestBuildContexts:
+
+    @pytest.fixture
+    def make_invoice(self, db):
+        def make(index, items=3):
+            invoice = Invoice.objects.create(
+                title=f"Batch Invoice {index}",
+                invoice_date="2024-09-10",
+                tracking_code=f"INV-{index}",
+                status="unpaid",
+                due_date="2024-10-10",
+                template_choice="quotation_1",
+            )
+            CustomerProfile.objects.create(
+                invoice=invoice,
+                name=f"Customer {index}",
+                contact={"Contact Info": {"email": f"c{index}@example.com"}},
+            )
+            Expense.objects.create(invoice=invoice, tax_percentage=10)
+            for position in range(items):
+                item = Item.objects.create(
+                    invoice=invoice,
+                    description=f"Item {position}",
+                    quantity=2,
+                    unit_price=Decimal("10.00"),
+                )
+                Column.objects.create(
+                    invoice=invoice, item=item, column_name="Size", value="L", priority=2
+                )
+                Column.objects.create(
+                    invoice=invoice, item=item, column_name="Color", value="Red", priority=1
+                )
+            return invoice
+
+        return make
+
+    def test_build_contexts(self, make_invoice):
+        invoice = make_invoice(1)
+        service = QuotationService()
+
+        [(built_invoice, context)] = list(service.build_contexts([invoice.id]))
+
+        assert built_invoice == invoice
+        assert context["customer_name"] == "Customer 1"
+        assert context["customer_email"] == "c1@example.com"
+        assert context["tax_percentage"] == Decimal("10.00")
+        assert len(context["items"]) == 3
+        assert context["items"][0].description == "Item 0"
+        assert list(context["items"][0].custom_data) == ["Color", "Size"]
+        assert context["custom_columns"] == {"Color", "Size"}
+
+    def test_build_contexts_keeps_order_and_skips_missing(self, make_invoice):
+        first, second = make_invoice(1), make_invoice(2)
+        service = QuotationService()
+
+        built = [
+            invoice for invoice, _ in service.build_contexts(
+                [str(second.id), "999999", str(first.id)]
+            )
+        ]
+
+        assert built == [second, first]
+
+    @pytest.mark.parametrize("count", [1, 10])
+    def test_build_contexts_query_count(
+        self, make_invoice, django_assert_num_queries, count
+    ):
+        invoice_ids = [make_invoice(index, items=5).id for index in range(count)]
+        service = QuotationService()
+
+        with django_assert_num_queries(3):
+            contexts = list(service.build_contexts(invoice_ids))
+
+        assert len(contexts) == count
+
+    def test_render_context_without_customer_or_expense(self, db):
+        invoice = Invoice.objects.create(
+            title="Bare Invoice",
+            invoice_date="2024-09-10",
+            tracking_code="INV-1",
+            status="unpaid",
+            due_date="2024-10-10",
+        )
+
+        context = QuotationService().render_context(invoice)
+
+        assert context["customer_name"] == ""
+        assert context["customer_email"] is None
+        assert context["grand_total"] == Decimal("0.00")
+
+
 @pytest.mark.django_db
 class TestExpenseService:
 
@@ -1,8 +1,16 @@
 import pytest
+from decimal import Decimal
 from unittest import mock
-from django.db import IntegrityError, OperationalError, transaction
-from sage_invoice.models import Invoice, Expense
-from sage_invoice.service.total import ExpenseService
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    IntegrityError,
+    OperationalError,
+    connection,
+    transaction,
+)
+from django.test.utils import CaptureQueriesContext
+from sage_invoice.models import Invoice, Expense, Item
+from sage_invoice.service.total import ExpenseService, PendingRecalculation
 from sage_invoice.signals import update_invoice_total_on_save
 from django.core.exceptions import ValidationError
 
@@ -71,3 +79,314 @@ class TestInvoiceSignals:
         update_invoice_total_on_save(Invoice, invoice, created=False)
 
         mock_calculate_and_save.assert_not_called()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCoalescedRecalculation:
+
+    def make_invoice(self):
+        return Invoice.objects.create(
+            title=f"Coalesced Invoice {Invoice.objects.count()}",
+            invoice_date="2024-09-01",
+            tracking_code="INV-C",
+            status="unpaid",
+            due_date="2024-09-15",
+            template_choice="quotation_1",
+        )
+
+    def test_saves_in_a_transaction_recalculate_once(self):
+        with mock.patch.object(
+            ExpenseService, "recalculate", autospec=True
+        ) as recalculate, transaction.atomic():
+            first = self.make_invoice()
+            second = self.make_invoice()
+            first.save()
+            Item.objects.create(
+                invoice=first, description="Item", quantity=1, unit_price=1
+            )
+            recalculate.assert_not_called()
+
+        recalculate.assert_called_once()
+        assert sorted(recalculate.call_args[0][1]) == [first.pk, second.pk]
+
+    def test_batch_runs_on_its_database(self):
+        invoice = self.make_invoice()
+        pending = PendingRecalculation(DEFAULT_DB_ALIAS)
+        pending.invoice_ids.add(invoice.pk)
+
+        with mock.patch.object(
+            ExpenseService, "sync_invoices", autospec=True
+        ) as sync_invoices, mock.patch.object(
+            ExpenseService, "get_subtotals", autospec=True, return_value={}
+        ) as get_subtotals:
+            pending()
+
+        assert get_subtotals.call_args[0][2] == DEFAULT_DB_ALIAS
+        assert sync_invoices.call_args[0][2] == DEFAULT_DB_ALIAS
+
+    def test_rolled_back_savepoint_keeps_batch_consistent(self):
+        with transaction.atomic():
+            invoice = self.make_invoice()
+            try:
+                with transaction.atomic():
+                    Item.objects.create(
+                        invoice=invoice, description="Item", quantity=1, unit_price=5
+                    )
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+            Item.objects.create(
+                invoice=invoice, description="Item", quantity=2, unit_price=10
+            )
+
+        assert Expense.objects.get(invoice=invoice).total_amount == Decimal("20.00")
+
+    def test_item_change_updates_totals(self):
+        invoice = self.make_invoice()
+        item = Item.objects.create(
+            invoice=invoice, description="Item", quantity=1, unit_price=7
+        )
+        assert Expense.objects.get(invoice=invoice).subtotal == Decimal("7.00")
+
+        item.delete()
+
+        assert Expense.objects.get(invoice=invoice).subtotal == Decimal("0.00")
+
+    def test_inline_save_of_50_items(self):
+        invoice = self.make_invoice()
+
+        with CaptureQueriesContext(connection) as captured:
+            with transaction.atomic():
+                invoice.save()
+                for position in range(50):
+                    Item.objects.create(
+                        invoice=invoice,
+                        description=f"Item {position}",
+                        quantity=1,
+                        unit_price=Decimal("2.00"),
+                    )
+
+        statements = [
+            query["sql"]
+            for query in captured.captured_queries
+            if not query["sql"].startswith(
+                ("BEGIN", "COMMIT", "SAVEPOINT", "RELEASE SAVEPOINT")
+            )
+        ]
+        # Invoice update, 50 item inserts, then one batch at commit: existing
+        # invoices, expenses, item aggregate, the expense update and the
+        # invoice sync
+        assert len(statements) == 1 + 50 + 5
+        assert sum("SUM(" in sql for sql in statements) == 1
+        assert Expense.objects.get(invoice=invoice).total_amount == Decimal("100.00")
+
+
+@pytest.mark.django_db(transaction=True)
+class TestItemDeltaUpdates:
+
+    @pytest.fixture
+    def invoice(self):
+        invoice = Invoice.objects.create(
+            title=f"Delta Invoice {Invoice.objects.count()}",
+            invoice_date="2024-09-01",
+            tracking_code="INV-D",
+            status="unpaid",
+            due_date="2024-09-15",
+            template_choice="quotation_1",
+        )
+        expense = Expense.objects.get(invoice=invoice)
+        expense.tax_percentage = Decimal("12.50")
+        expense.discount_percentage = Decimal("5.00")
+        expense.save()
+        return invoice
+
+    def amounts(self, invoice):
+        return Expense.objects.filter(invoice=invoice).values(
+            *ExpenseService.amount_fields
+        )[0]
+
+    def recalculated_amounts(self, invoice):
+        ExpenseService().recalculate([invoice.pk])
+        return self.amounts(invoice)
+
+    def test_deltas_match_full_recalculation(self, invoice):
+        other = Invoice.objects.create(
+            title="Delta Invoice other",
+            invoice_date="2024-09-01",
+            tracking_code="INV-D",
+            status="unpaid",
+            due_date="2024-09-15",
+            template_choice="quotation_1",
+        )
+        items = [
+            Item.objects.create(
+                invoice=invoice,
+                description=f"Item {position}",
+                quantity=position or None,
+                unit_price=Decimal("3.35") * (position + 1),
+            )
+            for position in range(4)
+        ]
+        items[0].unit_price = Decimal("9.99")
+        items[0].save()
+        items[1].delete()
+        moved = Item.objects.get(pk=items[2].pk)
+        moved.invoice = other
+        moved.save()
+
+        for changed in (invoice, other):
+            delta_amounts = self.amounts(changed)
+            assert delta_amounts == self.recalculated_amounts(changed)
+        assert self.amounts(other)["subtotal"] == Decimal("20.10")
+
+    def test_item_edit_is_one_update(self, invoice):
+        item = Item.objects.create(
+            invoice=invoice, description="Item", quantity=2, unit_price=5
+        )
+        item = Item.objects.get(pk=item.pk)
+        item.quantity = 3
+
+        with CaptureQueriesContext(connection) as captured:
+            item.save()
+
+        statements = [
+            query["sql"]
+            for query in captured.captured_queries
+            if not query["sql"].startswith(
+                ("BEGIN", "COMMIT", "SAVEPOINT", "RELEASE SAVEPOINT")
+            )
+        ]
+        # The item, the expense delta and the copy of its total on the invoice
+        assert [sql.split(" SET ")[0] for sql in statements] == [
+            'UPDATE "sage_invoice_items"',
+            'UPDATE "sage_expense"',
+            'UPDATE "sage_invoice"',
+        ]
+        assert not any("SUM(" in query["sql"] for query in captured.captured_queries)
+        assert self.amounts(invoice)["subtotal"] == Decimal("15.00")
+
+    def test_percentage_change_updates_amounts(self, invoice):
+        Item.objects.create(invoice=invoice, description="Item", unit_price=200)
+        expense = Expense.objects.get(invoice=invoice)
+        expense.tax_percentage = Decimal("10.00")
+
+        expense.save()
+
+        assert self.amounts(invoice)["tax_amount"] == Decimal("20.00")
+        assert self.amounts(invoice)["total_amount"] == Decimal("210.00")
+
+    def test_bulk_operations_recalculate(self, invoice):
+        items = Item.objects.bulk_create(
+            [
+                Item(invoice=invoice, description="Item", quantity=2, unit_price=4)
+                for _ in range(3)
+            ]
+        )
+        assert self.amounts(invoice)["subtotal"] == Decimal("24.00")
+
+        for item in items:
+            item.unit_price = Decimal("1.50")
+        Item.objects.bulk_update(items, ["unit_price"])
+
+        assert Item.objects.filter(invoice=invoice)[0].total_price == Decimal("3.00")
+        assert self.amounts(invoice)["subtotal"] == Decimal("9.00")
+
+    def test_queryset_delete_recalculates_once(self, invoice):
+        Item.objects.bulk_create(
+            [
+                Item(invoice=invoice, description="Item", quantity=2, unit_price=4)
+                for _ in range(200)
+            ]
+        )
+
+        with CaptureQueriesContext(connection) as captured:
+            Item.objects.filter(invoice=invoice).delete()
+
+        # Collecting and deleting the items, then one batch recalculation,
+        # instead of a subtotal delta per deleted item
+        assert len(captured.captured_queries) < 20
+        assert self.amounts(invoice)["subtotal"] == Decimal("0.00")
+        assert Invoice.objects.get(pk=invoice.pk).item_count == 0
+
+
+@pytest.mark.django_db(transaction=True)
+class TestDenormalizedTotals:
+
+    @pytest.fixture
+    def invoice(self):
+        invoice = Invoice.objects.create(
+            title=f"Denormalized Invoice {Invoice.objects.count()}",
+            invoice_date="2024-09-01",
+            tracking_code="INV-T",
+            status="unpaid",
+            due_date="2024-09-15",
+            template_choice="quotation_1",
+        )
+        expense = Expense.objects.get(invoice=invoice)
+        expense.tax_percentage = Decimal("10.00")
+        expense.save()
+        return invoice
+
+    def stored(self, invoice):
+        return Invoice.objects.values_list("grand_total", "item_count").get(
+            pk=invoice.pk
+        )
+
+    def test_item_changes_update_invoice(self, invoice):
+        item = Item.objects.create(
+            invoice=invoice, description="Item", quantity=2, unit_price=50
+        )
+        Item.objects.create(invoice=invoice, description="Item", unit_price=10)
+        assert self.stored(invoice) == (Decimal("121.00"), 2)
+
+        item.delete()
+
+        assert self.stored(invoice) == (Decimal("11.00"), 1)
+
+    def test_percentage_change_updates_invoice(self, invoice):
+        Item.objects.create(invoice=invoice, description="Item", unit_price=100)
+        expense = Expense.objects.get(invoice=invoice)
+        expense.discount_percentage = Decimal("20.00")
+
+        expense.save()
+
+        assert self.stored(invoice) == (Decimal("90.00"), 1)
+
+    def test_queryset_update_recomputes_totals(self, invoice):
+        Item.objects.bulk_create(
+            [Item(invoice=invoice, description="Item", unit_price=5) for _ in range(3)]
+        )
+
+        Item.objects.filter(invoice=invoice).update(quantity=4)
+
+        assert set(
+            Item.objects.filter(invoice=invoice).values_list("total_price", flat=True)
+        ) == {Decimal("20.00")}
+        assert self.stored(invoice) == (Decimal("66.00"), 3)
+
+    def test_queryset_update_without_quantity(self, invoice):
+        Item.objects.create(
+            invoice=invoice, description="Item", quantity=3, unit_price=5
+        )
+
+        Item.objects.filter(invoice=invoice).update(quantity=None, unit_price=7)
+
+        assert Item.objects.get(invoice=invoice).total_price == Decimal("7.00")
+        assert self.stored(invoice) == (Decimal("7.70"), 1)
+
+    def test_sort_and_filter_on_grand_total(self, invoice):
+        Item.objects.create(invoice=invoice, description="Item", unit_price=500)
+        cheap = Invoice.objects.create(
+            title="Denormalized cheap",
+            invoice_date="2024-09-01",
+            tracking_code="INV-T",
+            status="unpaid",
+            due_date="2024-09-15",
+            template_choice="quotation_1",
+        )
+        Item.objects.create(invoice=cheap, description="Item", unit_price=5)
+
+        assert list(
+            Invoice.objects.order_by("-grand_total").values_list("pk", flat=True)
+        ) == [invoice.pk, cheap.pk]
+        assert list(Invoice.objects.filter(grand_total__gte=100)) == [invoice]
@@ -0,0 +1,134 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from sage_invoice.models import Expense, Invoice, Item
+from sage_invoice.service.total import ExpenseService
+
+AMOUNT_FIELDS = ExpenseService.amount_fields
+
+
+def legacy_calculate_and_save(invoice_total):
+    """The in-Python implementation the aggregate path replaces."""
+    invoice_total.subtotal = sum(
+        item.total_price for item in invoice_total.invoice.items.all()
+    )
+    subtotal = invoice_total.subtotal
+    invoice_total.tax_amount = subtotal * (
+        Decimal(invoice_total.tax_percentage) / Decimal(100)
+    )
+    invoice_total.discount_amount = subtotal * (
+        Decimal(invoice_total.discount_percentage) / Decimal(100)
+    )
+    invoice_total.concession_amount = subtotal * (
+        Decimal(invoice_total.concession_percentage) / Decimal(100)
+    )
+    invoice_total.total_amount = (
+        subtotal
+        + invoice_total.tax_amount
+        - invoice_total.discount_amount
+        - invoice_total.concession_amount
+    )
+    invoice_total.save()
+
+
+def random_amount(rng, maximum):
+    return Decimal(rng.randint(0, maximum * 100)) / 100
+
+
+def make_invoice(rng, index, items, percentages):
+    invoice = Invoice.objects.create(
+        title=f"Invoice {index}",
+        invoice_date="2024-09-10",
+        tracking_code=f"INV-{index}",
+        status="unpaid",
+        due_date="2024-10-10",
+        template_choice="quotation_1",
+    )
+    Item.objects.bulk_create(
+        [
+            Item(
+                invoice=invoice,
+                description=f"Item {position}",
+                quantity=quantity,
+                unit_price=unit_price,
+                total_price=unit_price * quantity if quantity else unit_price,
+            )
+            for position, (quantity, unit_price) in enumerate(items)
+        ]
+    )
+    return Expense.objects.create(invoice=invoice, **percentages)
+
+
+def random_case(rng):
+    items = [
+        (rng.choice([None, rng.randint(1, 100)]), random_amount(rng, 999))
+        for _ in range(rng.randint(0, 20))
+    ]
+    percentages = {
+        name: rng.choice(
+            [Decimal("0"), Decimal("33.33"), Decimal("12.5"), random_amount(rng, 100)]
+        )
+        for name in (
+            "tax_percentage",
+            "discount_percentage",
+            "concession_percentage",
+        )
+    }
+    return items, percentages
+
+
+def stored_amounts(expense):
+    expense = Expense.objects.get(pk=expense.pk)
+    return {field: getattr(expense, field) for field in AMOUNT_FIELDS}
+
+
+@pytest.mark.django_db
+class TestAggregateTotals:
+
+    @pytest.mark.parametrize("seed", range(25))
+    def test_matches_python_sum(self, seed):
+        """Random invoices store the same rounded amounts on both paths."""
+        rng = random.Random(seed)
+        cases = [random_case(rng) for _ in range(4)]
+        legacy = [
+            make_invoice(rng, f"{seed}-legacy-{index}", *case)
+            for index, case in enumerate(cases)
+        ]
+        aggregate = [
+            make_invoice(rng, f"{seed}-aggregate-{index}", *case)
+            for index, case in enumerate(cases)
+        ]
+
+        for expense in legacy:
+            legacy_calculate_and_save(expense)
+        ExpenseService().calculate_and_save(aggregate[0])
+        ExpenseService().recalculate(expense.invoice_id for expense in aggregate[1:])
+
+        for expected, actual in zip(legacy, aggregate):
+            assert stored_amounts(actual) == stored_amounts(expected)
+
+    def test_half_cent_amounts(self):
+        rng = random.Random(0)
+        legacy = make_invoice(
+            rng, "legacy", [(None, Decimal("0.05"))], {"tax_percentage": 10}
+        )
+        aggregate = make_invoice(
+            rng, "aggregate", [(None, Decimal("0.05"))], {"tax_percentage": 10}
+        )
+
+        legacy_calculate_and_save(legacy)
+        ExpenseService().calculate_and_save(aggregate)
+
+        assert stored_amounts(aggregate) == stored_amounts(legacy)
+
+    def test_items_are_not_loaded(self, django_assert_num_queries):
+        rng = random.Random(1)
+        expenses = [
+            make_invoice(rng, index, *random_case(rng)) for index in range(10)
+        ]
+
+        # Expenses, item aggregate, expense update and invoice sync
+        with django_assert_num_queries(4):
+            ExpenseService().recalculate(expense.invoice_id for expense in expenses)
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import time
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory
+
+from sage_invoice.models import Expense, Invoice, Item
+from sage_invoice.service.discovery import template_registry
+from sage_invoice.service.invoice_create import QuotationService
+from sage_invoice.views.invoice import (
+    AsyncGenerateInvoicesView,
+    GenerateInvoicesView,
+    TemplateChoiceView,
+)
+
+
+@pytest.mark.django_db
+class TestGenerateInvoicesView:
+
+    @pytest.fixture
+    def invoices(self, db):
+        invoices = []
+        for index in range(3):
+            invoice = Invoice.objects.create(
+                title=f"Invoice {index}",
+                invoice_date="2024-09-10",
+                tracking_code=f"INV-{index}",
+                status="unpaid",
+                due_date="2024-10-10",
+                template_choice="quotation_1",
+            )
+            Expense.objects.create(invoice=invoice)
+            Item.objects.create(
+                invoice=invoice,
+                description="Item",
+                quantity=1,
+                unit_price=Decimal("10.00"),
+            )
+            invoices.append(invoice)
+        return invoices
+
+    def get(self, query, **headers):
+        request = RequestFactory().get("/generate-pdfs/", query, **headers)
+        return GenerateInvoicesView.as_view()(request)
+
+    def test_missing_ids(self):
+        response = self.get({})
+        assert response.status_code == 400
+
+    def test_json_response(self, invoices):
+        ids = ",".join(str(invoice.id) for invoice in invoices)
+
+        response = self.get({"invoice_ids": ids})
+
+        data = json.loads(response.content)
+        assert [entry["id"] for entry in data["invoices"]] == [
+            invoice.id for invoice in invoices
+        ]
+        assert "Invoice 0" in data["invoices"][0]["rendered_html"]
+
+    def test_stream_response(self, invoices, settings):
+        settings.SAGE_INVOICE_RENDER_CHUNK_SIZE = 2
+        ids = ",".join(str(invoice.id) for invoice in invoices)
+
+        response = self.get({"invoice_ids": ids, "stream": "1"})
+
+        assert isinstance(response, StreamingHttpResponse)
+        assert response["Content-Type"] == "application/x-ndjson"
+        chunks = list(response.streaming_content)
+        assert len(chunks) == len(invoices)
+        assert [json.loads(chunk)["id"] for chunk in chunks] == [
+            invoice.id for invoice in invoices
+        ]
+
+    def test_stream_via_accept_header(self, invoices):
+        response = self.get(
+            {"invoice_ids": str(invoices[0].id)},
+            HTTP_ACCEPT="application/x-ndjson",
+        )
+
+        assert isinstance(response, StreamingHttpResponse)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsyncGenerateInvoicesView:
+
+    @pytest.fixture
+    def invoice_ids(self):
+        invoice_ids = []
+        for index in range(2):
+            invoice = Invoice.objects.create(
+                title=f"Async Invoice {index}",
+                invoice_date="2024-09-10",
+                tracking_code=f"INV-{index}",
+                status="unpaid",
+                due_date="2024-10-10",
+                template_choice="quotation_1",
+            )
+            Item.objects.create(
+                invoice=invoice,
+                description="Item",
+                quantity=1,
+                unit_price=Decimal("10.00"),
+            )
+            invoice_ids.append(invoice.id)
+        return invoice_ids
+
+    def get(self, query):
+        request = RequestFactory().get("/generate-pdfs/async/", query)
+        return AsyncGenerateInvoicesView.as_view()(request)
+
+    def test_renders_invoices(self, invoice_ids):
+        ids = ",".join(str(invoice_id) for invoice_id in reversed(invoice_ids))
+
+        response = asyncio.run(self.get({"invoice_ids": ids}))
+
+        data = json.loads(response.content)
+        assert [entry["id"] for entry in data["invoices"]] == invoice_ids[::-1]
+        assert "Async Invoice 1" in data["invoices"][0]["rendered_html"]
+
+    def test_missing_ids(self):
+        response = asyncio.run(self.get({}))
+        assert response.status_code == 400
+
+    def test_overlapping_requests_do_not_serialize(self, invoice_ids, settings):
+        settings.SAGE_INVOICE_ASYNC_CONCURRENCY = 4
+        delay = 0.3
+
+        def slow_render(service, invoice, context=None):
+            time.sleep(delay)
+            return invoice.title
+
+        async def overlapping_requests():
+            ids = ",".join(str(invoice_id) for invoice_id in invoice_ids)
+            return await asyncio.gather(
+                self.get({"invoice_ids": ids}), self.get({"invoice_ids": ids})
+            )
+
+        with mock.patch.object(QuotationService, "render_invoice", slow_render):
+            started = time.monotonic()
+            responses = asyncio.run(overlapping_requests())
+            elapsed = time.monotonic() - started
+
+        assert all(response.status_code == 200 for response in responses)
+        # Four renders run sequentially would take 4 * delay
+        assert elapsed < 2 * delay
+
+
+class TestTemplateChoiceView:
+
+    @pytest.fixture(autouse=True)
+    def fresh_registry(self):
+        template_registry.clear()
+        yield
+        template_registry.clear()
+
+    def get(self, check="F", **headers):
+        request = RequestFactory().get(f"/template-choices/{check}", **headers)
+        return TemplateChoiceView.as_view()(request, check=check)
+
+    def test_response_has_validators(self, settings):
+        settings.SAGE_INVOICE_TEMPLATE_CHOICES_MAX_AGE = 120
+
+        response = self.get()
+
+        assert response.status_code == 200
+        assert response["ETag"].startswith('"')
+        assert "max-age=120" in response["Cache-Control"]
+        assert {"value": "quotation_1", "label": "quotation_1"} in json.loads(
+            response.content
+        )
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.get()["ETag"]
+
+        with mock.patch(
+            "sage_invoice.views.invoice.get_template_choices",
+            side_effect=AssertionError,
+        ):
+            response = self.get(HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+        assert "max-age" in response["Cache-Control"]
+
+    def test_etag_differs_per_receipt_flag(self):
+        assert self.get("F")["ETag"] != self.get("T")["ETag"]
+
+    def test_stale_etag_returns_choices(self):
+        response = self.get(HTTP_IF_NONE_MATCH='"stale"')
+
+        assert response.status_code == 200
@@ -1,7 +1,10 @@
 from django.urls import path
 
 from sage_invoice.views.invoice import (
+    AsyncGenerateInvoicesView,
+    DownloadInvoicesArchiveView,
     DownloadInvoicesView,
+    ExportInvoicesView,
     GenerateInvoicesView,
     InvoiceDetailView,
     TemplateChoiceView,
@@ -19,7 +22,18 @@ urlpatterns = [
         name="template_choices",
     ),
     path("generate-pdfs/", GenerateInvoicesView.as_view(), name="generate_pdfs"),
+    path(
+        "generate-pdfs/async/",
+        AsyncGenerateInvoicesView.as_view(),
+        name="generate_pdfs_async",
+    ),
     path(
         "download-invoices/", DownloadInvoicesView.as_view(), name="download_invoices"
     ),
+    path(
+        "download-invoices/archive/",
+        DownloadInvoicesArchiveView.as_view(),
+        name="download_invoices_archive",
+    ),
+    path("export-invoices/", ExportInvoicesView.as_view(), name="export_invoices"),
 ]
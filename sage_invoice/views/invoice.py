@@ -1,14 +1,23 @@
+import json
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.core.exceptions import PermissionDenied
-from django.http import JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
-from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django.views import View
 from django.views.generic import DetailView, TemplateView
 
 from sage_invoice.helpers.funcs import get_template_choices
 from sage_invoice.models import Invoice
+from sage_invoice.service.archive import ArchiveService
+from sage_invoice.service.discovery import template_registry
+from sage_invoice.service.export import ExportService
 from sage_invoice.service.invoice_create import QuotationService
+from sage_invoice.service.pdf import is_pdf_available
 
 
 class InvoiceDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
@@ -48,25 +57,48 @@ class InvoiceDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
 
 
 class TemplateChoiceView(View):
+    """
+    Return the template choices for the receipt flag in the URL.
+
+    Responses carry a strong ETag derived from the template registry so
+    revalidations are answered with 304, and are cached by the browser for
+    ``SAGE_INVOICE_TEMPLATE_CHOICES_MAX_AGE`` seconds.
+    """
+
     def get(self, request, *args, **kwargs):
         is_receipt = self.kwargs.get("check")
         if "T" in is_receipt:
             is_receipt = True
         else:
             is_receipt = False
-        choices = get_template_choices(is_receipt=is_receipt)
-        formatted_choices = [
-            {"value": choice[0], "label": choice[1]} for choice in choices
-        ]
-        return JsonResponse(formatted_choices, safe=False)
+        etag = quote_etag(template_registry.get_digest(is_receipt=is_receipt))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            choices = get_template_choices(is_receipt=is_receipt)
+            formatted_choices = [
+                {"value": choice[0], "label": choice[1]} for choice in choices
+            ]
+            response = JsonResponse(formatted_choices, safe=False)
+        response["ETag"] = etag
+        patch_cache_control(
+            response,
+            private=True,
+            max_age=getattr(settings, "SAGE_INVOICE_TEMPLATE_CHOICES_MAX_AGE", 60),
+        )
+        return response
 
 
 class GenerateInvoicesView(TemplateView):
     """
     This view generates multiple invoices and returns their rendered HTML for PDF
     generation.
+
+    Pass ``stream=1`` (or ``Accept: application/x-ndjson``) to receive one JSON
+    object per line, flushed as soon as each invoice is rendered.
     """
 
+    stream_content_type = "application/x-ndjson"
+
     def get(self, request, *args, **kwargs):
         invoice_ids = request.GET.get("invoice_ids", "")
         invoice_ids = invoice_ids.split(",") if invoice_ids else []
@@ -74,32 +106,59 @@ class GenerateInvoicesView(TemplateView):
         if not invoice_ids:
             return JsonResponse({"error": "No invoice IDs provided"}, status=400)
 
-        invoices_data = []
+        if self.wants_stream(request):
+            return StreamingHttpResponse(
+                self.stream_invoices(invoice_ids),
+                content_type=self.stream_content_type,
+            )
+
+        return JsonResponse({"invoices": list(self.render_invoices(invoice_ids))})
 
-        for invoice_id in invoice_ids:
-            invoice = Invoice.objects.filter(id=invoice_id).first()
-            if not invoice:
-                continue
+    def wants_stream(self, request):
+        return request.GET.get("stream") in ("1", "true") or (
+            self.stream_content_type in request.headers.get("Accept", "")
+        )
 
-            service = QuotationService()
-            rendered_content = service.render_context(invoice)
+    def render_invoices(self, invoice_ids):
+        """Yield the rendered invoices, loading them in bounded chunks."""
+        service = QuotationService()
 
-            # Determine the template based on invoice type
-            if invoice.receipt:
-                template_name = f"receipt{invoice.template_choice}.html"
-            else:
-                template_name = f"quotation{invoice.template_choice}.html"
+        for invoice, context in service.build_contexts(invoice_ids):
+            yield {
+                "id": invoice.id,
+                "title": invoice.title or f"Invoice_{invoice.id}",
+                "rendered_html": service.render_invoice(invoice, context),
+            }
 
-            rendered_html = render_to_string(template_name, rendered_content)
+    def stream_invoices(self, invoice_ids):
+        for invoice_data in self.render_invoices(invoice_ids):
+            yield json.dumps(invoice_data, cls=DjangoJSONEncoder) + "\n"
 
-            invoices_data.append(
-                {
-                    "id": invoice.id,
-                    "title": invoice.title or f"Invoice_{invoice.id}",
-                    "rendered_html": rendered_html,
-                }
-            )
 
+class AsyncGenerateInvoicesView(View):
+    """
+    Async variant of ``GenerateInvoicesView`` for ASGI deployments.
+
+    Invoices are loaded with the async ORM and rendered concurrently on a
+    bounded executor, so the event loop stays free for other requests.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        invoice_ids = request.GET.get("invoice_ids", "")
+        invoice_ids = invoice_ids.split(",") if invoice_ids else []
+
+        if not invoice_ids:
+            return JsonResponse({"error": "No invoice IDs provided"}, status=400)
+
+        rendered = await QuotationService().arender_invoices(invoice_ids)
+        invoices_data = [
+            {
+                "id": invoice.id,
+                "title": invoice.title or f"Invoice_{invoice.id}",
+                "rendered_html": rendered_html,
+            }
+            for invoice, rendered_html in rendered
+        ]
         return JsonResponse({"invoices": invoices_data})
 
 
@@ -111,3 +170,59 @@ class DownloadInvoicesView(View):
         context = {"invoice_ids": invoice_ids}
 
         return render(request, "download_invoices.html", context)
+
+
+class DownloadInvoicesArchiveView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Stream a ZIP archive with one PDF (or HTML with ``format=html``) entry per
+    invoice, written entry by entry as each invoice is rendered.
+    """
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        invoice_ids = request.GET.get("invoice_ids", "")
+        invoice_ids = invoice_ids.split(",") if invoice_ids else []
+        if not invoice_ids:
+            return HttpResponseBadRequest("No invoice IDs provided")
+
+        default_format = "pdf" if is_pdf_available() else "html"
+        file_format = request.GET.get("format", default_format)
+        if file_format not in ArchiveService.formats:
+            return HttpResponseBadRequest(f"Unsupported format: {file_format}")
+
+        response = StreamingHttpResponse(
+            ArchiveService().stream(invoice_ids, file_format),
+            content_type="application/zip",
+        )
+        response["Content-Disposition"] = 'attachment; filename="invoices.zip"'
+        return response
+
+
+class ExportInvoicesView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Stream invoices as CSV or JSON Lines (``format=jsonl``), gzip-compressed
+    with ``gzip=1``. Exports every invoice unless ``invoice_ids`` is given.
+    """
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        file_format = request.GET.get("format", "csv")
+        if file_format not in ExportService.formats:
+            return HttpResponseBadRequest(f"Unsupported format: {file_format}")
+
+        queryset = Invoice.objects.all()
+        invoice_ids = request.GET.get("invoice_ids", "")
+        if invoice_ids:
+            queryset = queryset.filter(id__in=invoice_ids.split(","))
+
+        service = ExportService(file_format, compress=request.GET.get("gzip") == "1")
+        response = StreamingHttpResponse(
+            service.stream(queryset), content_type=service.content_type
+        )
+        filename = service.get_filename()
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response